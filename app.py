@@ -1,12 +1,14 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import Flask, render_template, request, redirect, url_for, session, flash, stream_with_context, g
 import sqlite3
 import os
+import threading
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import timedelta
-import pandas as pd
-from io import BytesIO, StringIO
-import csv
 import datetime
+import numpy as np
+from app.exports import stream_csv, spool_xlsx, stream_file
+from app.distribution import percentiles
+from app.database import apply_sqlite_pragmas, BUSY_TIMEOUT_MS
 
 # Création de la base si elle n'existe pas
 def init_db():
@@ -40,11 +42,82 @@ ADMIN_CREDENTIALS = {
     'admin': generate_password_hash('admin123')
 }
 
+# Requêtes SQL (texte constant = requête préparée réutilisée)
+COUNT_SQL = 'SELECT COUNT(*) FROM employees'
+SUMMARY_SQL = 'SELECT COUNT(*), AVG(salaire), SUM(salaire) FROM employees'
+SALAIRES_SQL = 'SELECT salaire FROM employees WHERE salaire IS NOT NULL'
+EMPLOYEE_SQL = 'SELECT * FROM employees WHERE id = ?'
+INSERT_SQL = '''
+    INSERT INTO employees (nom, prenom, email, telephone, poste, salaire, date_embauche, departement)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+UPDATE_SQL = '''
+    UPDATE employees SET 
+    nom=?, prenom=?, email=?, telephone=?, poste=?, salaire=?, date_embauche=?, departement=?
+    WHERE id=?
+'''
+DELETE_SQL = 'DELETE FROM employees WHERE id = ? RETURNING nom, prenom'
+DEPTS_SQL = '''
+    SELECT departement, COUNT(*) as count, AVG(salaire) as avg_salaire, SUM(salaire) as total_salaire
+    FROM employees WHERE departement IS NOT NULL GROUP BY departement ORDER BY count DESC
+'''
+TOP_SALAIRES_SQL = '''
+    SELECT nom, prenom, poste, salaire, departement 
+    FROM employees ORDER BY salaire DESC LIMIT 5
+'''
+EVOLUTION_SQL = '''
+    SELECT strftime('%Y', date_embauche) as annee, COUNT(*) as embauches, AVG(salaire) as salaire_moyen
+    FROM employees GROUP BY annee ORDER BY annee
+'''
+DEPT_COUNTS_SQL = '''
+    SELECT departement, COUNT(*) as count 
+    FROM employees 
+    WHERE departement IS NOT NULL 
+    GROUP BY departement
+'''
+EXPORT_SQL = '''
+    SELECT id, nom, prenom, email, telephone, poste, salaire, date_embauche, departement
+    FROM employees ORDER BY nom, id
+'''
+
+# Connexions réutilisées : une par requête (flask.g), reprise dans un petit
+# pool par thread au lieu d'ouvrir un fichier à chaque appel. Les requêtes
+# SQL sont des constantes : le cache de requêtes préparées de sqlite3 les
+# retrouve d'un appel à l'autre.
+POOL_SIZE = 2
+STATEMENT_CACHE_SIZE = 256
+_pool = threading.local()
+
 def get_db_connection():
-    conn = sqlite3.connect('huma_rh.db')
+    # Profil concurrent : WAL, busy_timeout, cache (voir app/database.py)
+    conn = sqlite3.connect('huma_rh.db', timeout=BUSY_TIMEOUT_MS / 1000,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+    apply_sqlite_pragmas(conn)
     conn.row_factory = sqlite3.Row
     return conn
 
+def get_db():
+    """Connexion de la requête en cours, prise dans le pool du thread"""
+    if 'db' not in g:
+        idle = getattr(_pool, 'idle', None)
+        g.db = idle.pop() if idle else get_db_connection()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exception):
+    conn = g.pop('db', None)
+    if conn is None:
+        return
+    if conn.in_transaction:
+        # Requête interrompue avant son commit : rien ne doit fuiter vers la suivante
+        conn.rollback()
+    if not hasattr(_pool, 'idle'):
+        _pool.idle = []
+    if len(_pool.idle) < POOL_SIZE:
+        _pool.idle.append(conn)
+    else:
+        conn.close()
+
 def login_required(f):
     def wrap(*args, **kwargs):
         if 'user' not in session:
@@ -79,15 +152,13 @@ def logout():
 @app.route('/')
 @login_required
 def index():
-    conn = get_db_connection()
-    total = conn.execute('SELECT COUNT(*) FROM employees').fetchone()[0]
-    conn.close()
+    total = get_db().execute(COUNT_SQL).fetchone()[0]
     return render_template('index.html', total=total)
 
 @app.route('/employes')
 @login_required
 def liste_employes():
-    conn = get_db_connection()
+    conn = get_db()
     recherche = request.args.get('recherche', '')
     departement = request.args.get('departement', '')
     salaire_min = request.args.get('salaire_min', '')
@@ -111,10 +182,10 @@ def liste_employes():
     
     employees = conn.execute(query, params).fetchall()
     
-    total_employes = conn.execute('SELECT COUNT(*) FROM employees').fetchone()[0]
-    salaire_moyen = conn.execute('SELECT AVG(salaire) FROM employees').fetchone()[0] or 0
+    # Effectif et salaire moyen en un seul passage
+    total_employes, salaire_moyen = conn.execute(SUMMARY_SQL).fetchone()[:2]
+    salaire_moyen = salaire_moyen or 0
     
-    conn.close()
     return render_template('employes.html', 
                          employees=employees,
                          total_employes=total_employes,
@@ -127,12 +198,9 @@ def liste_employes():
 @login_required
 def ajouter_employe():
     if request.method == 'POST':
-        conn = get_db_connection()
+        conn = get_db()
         try:
-            conn.execute('''
-                INSERT INTO employees (nom, prenom, email, telephone, poste, salaire, date_embauche, departement)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            conn.execute(INSERT_SQL, (
                 request.form['nom'],
                 request.form['prenom'],
                 request.form['email'],
@@ -145,9 +213,8 @@ def ajouter_employe():
             conn.commit()
             flash('✅ Employé ajouté avec succès !', 'success')
         except sqlite3.IntegrityError:
+            conn.rollback()
             flash('❌ Erreur : Email déjà utilisé !', 'error')
-        finally:
-            conn.close()
         return redirect(url_for('liste_employes'))
     
     return render_template('ajouter.html')
@@ -155,15 +222,11 @@ def ajouter_employe():
 @app.route('/modifier/<int:employe_id>', methods=['GET', 'POST'])
 @login_required
 def modifier_employe(employe_id):
-    conn = get_db_connection()
+    conn = get_db()
     
     if request.method == 'POST':
         try:
-            conn.execute('''
-                UPDATE employees SET 
-                nom=?, prenom=?, email=?, telephone=?, poste=?, salaire=?, date_embauche=?, departement=?
-                WHERE id=?
-            ''', (
+            conn.execute(UPDATE_SQL, (
                 request.form['nom'],
                 request.form['prenom'],
                 request.form['email'],
@@ -177,13 +240,11 @@ def modifier_employe(employe_id):
             conn.commit()
             flash('✅ Employé modifié avec succès !', 'success')
         except sqlite3.IntegrityError:
+            conn.rollback()
             flash('❌ Erreur : Email déjà utilisé !', 'error')
-        finally:
-            conn.close()
         return redirect(url_for('liste_employes'))
     
-    employe = conn.execute('SELECT * FROM employees WHERE id = ?', (employe_id,)).fetchone()
-    conn.close()
+    employe = conn.execute(EMPLOYEE_SQL, (employe_id,)).fetchone()
     
     if employe is None:
         flash('❌ Employé non trouvé !', 'error')
@@ -194,15 +255,14 @@ def modifier_employe(employe_id):
 @app.route('/supprimer/<int:employe_id>')
 @login_required
 def supprimer_employe(employe_id):
-    conn = get_db_connection()
-    employe = conn.execute('SELECT nom, prenom FROM employees WHERE id = ?', (employe_id,)).fetchone()
+    conn = get_db()
+    # Lecture et suppression en un seul aller-retour
+    employe = conn.execute(DELETE_SQL, (employe_id,)).fetchone()
+    conn.commit()
     if employe:
-        conn.execute('DELETE FROM employees WHERE id = ?', (employe_id,))
-        conn.commit()
         flash(f'✅ {employe["prenom"]} {employe["nom"]} supprimé !', 'success')
     else:
         flash('❌ Employé non trouvé !', 'error')
-    conn.close()
     return redirect(url_for('liste_employes'))
 
 @app.route('/init_departements')
@@ -234,29 +294,20 @@ def init_departements():
 @app.route('/stats')
 @login_required
 def dashboard_stats():
-    conn = get_db_connection()
-    
-    total_employes = conn.execute('SELECT COUNT(*) FROM employees').fetchone()[0]
-    salaire_moyen = conn.execute('SELECT AVG(salaire) FROM employees').fetchone()[0] or 0
-    salaire_total = conn.execute('SELECT SUM(salaire) FROM employees').fetchone()[0] or 0
-    salaire_median = conn.execute('SELECT AVG(salaire) FROM (SELECT salaire FROM employees ORDER BY salaire LIMIT 2 OFFSET ((SELECT COUNT(*) FROM employees) - 1)/2)').fetchone()[0] or 0
-    
-    depts = conn.execute('''
-        SELECT departement, COUNT(*) as count, AVG(salaire) as avg_salaire, SUM(salaire) as total_salaire
-        FROM employees WHERE departement IS NOT NULL GROUP BY departement ORDER BY count DESC
-    ''').fetchall()
+    conn = get_db()
     
-    top_salaires = conn.execute('''
-        SELECT nom, prenom, poste, salaire, departement 
-        FROM employees ORDER BY salaire DESC LIMIT 5
-    ''').fetchall()
+    # Effectif, moyenne et masse salariale en un seul passage
+    total_employes, salaire_moyen, salaire_total = conn.execute(SUMMARY_SQL).fetchone()
+    salaire_moyen = salaire_moyen or 0
+    salaire_total = salaire_total or 0
+    # Médiane exacte par le moteur de percentiles (app/distribution.py) : un
+    # passage sur la colonne des salaires, sans tri SQL
+    salaires = np.fromiter((row[0] for row in conn.execute(SALAIRES_SQL)), np.float64)
+    salaire_median = percentiles(salaires, [50])['p50'] or 0
     
-    evolution = conn.execute('''
-        SELECT strftime('%Y', date_embauche) as annee, COUNT(*) as embauches, AVG(salaire) as salaire_moyen
-        FROM employees GROUP BY annee ORDER BY annee
-    ''').fetchall()
-    
-    conn.close()
+    depts = conn.execute(DEPTS_SQL).fetchall()
+    top_salaires = conn.execute(TOP_SALAIRES_SQL).fetchall()
+    evolution = conn.execute(EVOLUTION_SQL).fetchall()
     
     return render_template('stats.html', 
                          total_employes=total_employes,
@@ -291,26 +342,15 @@ def fix_columns():
     conn.close()
     return "<br>".join(messages)
 
+def iter_export_rows():
+    """Parcourt les employés en flux (connexion de la requête, rendue au pool en fin d'export)"""
+    yield from get_db().execute(EXPORT_SQL)
+
 @app.route('/export/csv')
 @login_required
 def export_csv():
-    conn = get_db_connection()
-    employees = conn.execute('SELECT * FROM employees ORDER BY nom').fetchall()
-    conn.close()
-    
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['ID', 'Nom', 'Prénom', 'Email', 'Téléphone', 'Poste', 'Salaire (€)', 'Date Embauche', 'Département'])
-    
-    for emp in employees:
-        writer.writerow([
-            emp['id'], emp['nom'], emp['prenom'], emp['email'], 
-            emp['telephone'] or '', emp['poste'], f"{emp['salaire']:.2f}",
-            emp['date_embauche'], emp['departement'] or ''
-        ])
-    
     return app.response_class(
-        output.getvalue(),
+        stream_with_context(stream_csv(iter_export_rows())),
         mimetype='text/csv',
         headers={'Content-Disposition': 'attachment;filename=huma_rh.csv'}
     )
@@ -318,18 +358,10 @@ def export_csv():
 @app.route('/export/excel')
 @login_required
 def export_excel():
-    conn = get_db_connection()
-    employees = conn.execute('SELECT * FROM employees ORDER BY nom').fetchall()
-    conn.close()
-    
-    df = pd.DataFrame([dict(emp) for emp in employees])
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Employés', index=False)
-    output.seek(0)
+    output = spool_xlsx(iter_export_rows())
     
     return app.response_class(
-        output.read(),
+        stream_file(output),
         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         headers={'Content-Disposition': 'attachment;filename=huma_rh.xlsx'}
     )
@@ -337,17 +369,8 @@ def export_excel():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    conn = get_db_connection()
-    
     # Récupérer les vraies données de la DB
-    depts = conn.execute('''
-        SELECT departement, COUNT(*) as count 
-        FROM employees 
-        WHERE departement IS NOT NULL 
-        GROUP BY departement
-    ''').fetchall()
-    
-    conn.close()
+    depts = get_db().execute(DEPT_COUNTS_SQL).fetchall()
     
     departments = [d['departement'] for d in depts]
     counts = [d['count'] for d in depts]
@@ -366,11 +389,9 @@ def init_command():
 @app.cli.command('stats')
 def stats_command():
     """Affiche les statistiques rapides"""
-    conn = get_db_connection()
-    total = conn.execute('SELECT COUNT(*) FROM employees').fetchone()[0]
-    moyenne = conn.execute('SELECT AVG(salaire) FROM employees').fetchone()[0] or 0
-    total_masse = conn.execute('SELECT SUM(salaire) FROM employees').fetchone()[0] or 0
-    conn.close()
+    total, moyenne, total_masse = get_db().execute(SUMMARY_SQL).fetchone()
+    moyenne = moyenne or 0
+    total_masse = total_masse or 0
     print(f"📊 STATS: {total} employés | Moyenne: {moyenne:.0f}€ | Masse salariale: {total_masse:.0f}€")
 
 @app.cli.command('reset')
@@ -378,10 +399,9 @@ def reset_command():
     """⚠️ SUPPRIME TOUS les employés (ATTENTION!)"""
     confirm = input("⚠️ Êtes-vous SÛR? Tape 'OUI' : ")
     if confirm == 'OUI':
-        conn = get_db_connection()
+        conn = get_db()
         conn.execute('DELETE FROM employees')
         conn.commit()
-        conn.close()
         print("🗑️ Base VIDE !")
     else:
         print("❌ Annulé")
@@ -389,7 +409,7 @@ def reset_command():
 @app.cli.command('add-demo')
 def add_demo_command():
     """Ajoute 5 employés DE TEST"""
-    conn = get_db_connection()
+    conn = get_db()
     demos = [
         ('Dupont', 'Jean', 'jean.dupont@entreprise.fr', '0123456789', 'Développeur', 3800, '2025-01-15', 'IT'),
         ('Martin', 'Marie', 'marie.martin@entreprise.fr', '0987654321', 'RH Manager', 4200, '2024-06-01', 'RH'),
@@ -400,13 +420,11 @@ def add_demo_command():
     count = 0
     for nom, prenom, email, tel, poste, salaire, date, dept in demos:
         try:
-            conn.execute('INSERT INTO employees (nom, prenom, email, telephone, poste, salaire, date_embauche, departement) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', 
-                        (nom, prenom, email, tel, poste, salaire, date, dept))
+            conn.execute(INSERT_SQL, (nom, prenom, email, tel, poste, salaire, date, dept))
             count += 1
         except sqlite3.IntegrityError:
             pass
     conn.commit()
-    conn.close()
     print(f"✅ {count} employés DE TEST ajoutés !")
 
 @app.cli.command('help')
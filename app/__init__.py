@@ -2,11 +2,23 @@ from flask import Flask
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 from app.config import config
+from app.database import configure_engine, init_sqlite, pending_columns
 from app.models import db, User
 from app.routes.auth import auth_bp
 from app.routes.employees import employees_bp
 from app.routes.stats import stats_bp
+from app.routes.api import api_bp
+from app.search import init_search_index
+from app.aggregates import init_aggregates
+from app.departments import init_departments
+from app.commands import register_commands
+from app.instrumentation import init_instrumentation
+from app.compression import init_compression
+from app.audit import init_audit
+from app.user_cache import load_snapshot
+from app.cache import init_epoch
 import json
 
 login_manager = LoginManager()
@@ -18,8 +30,15 @@ def create_app(config_name='default'):
     app = Flask(__name__, template_folder='../templates', static_folder='../static')
     app.config.from_object(config[config_name])
 
+    # Reverse proxy devant gunicorn : IP et schéma du client (X-Forwarded-*)
+    hops = app.config.get('PROXY_FIX_HOPS', 0)
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+
     # Initialiser les extensions
+    configure_engine(app)
     db.init_app(app)
+    init_sqlite(app)
     login_manager.init_app(app)
     csrf.init_app(app)
     migrate.init_app(app, db)
@@ -29,10 +48,12 @@ def create_app(config_name='default'):
     login_manager.login_message = '🔐 Veuillez vous connecter pour accéder à cette page.'
     login_manager.login_message_category = 'error'
 
-    # User loader
+    # User loader : instantané en cache (voir app/user_cache.py) ;
+    # un compte désactivé est déconnecté à la requête suivante
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        user = load_snapshot(int(user_id))
+        return user if user is not None and user.is_active else None
 
     # Filtre personnalisé pour parser JSON dans les templates
     @app.template_filter('from_json')
@@ -46,12 +67,35 @@ def create_app(config_name='default'):
     app.register_blueprint(auth_bp)
     app.register_blueprint(employees_bp)
     app.register_blueprint(stats_bp)
+    app.register_blueprint(api_bp)
+
+    # Commandes CLI (flask ...)
+    register_commands(app)
+
+    # Mesures par requête (INSTRUMENTATION=1)
+    init_instrumentation(app)
+
+    # Compression gzip / brotli (après l'instrumentation : exécutée avant elle en fin de requête)
+    init_compression(app)
 
     # Créer les tables et l'admin par défaut
     with app.app_context():
         db.create_all()
+        # Base d'une version précédente : les initialisations lisent le nouveau
+        # schéma, elles attendent « flask db upgrade » (qui passe par ici)
+        pending = pending_columns()
+        if pending:
+            print(f"⚠️ Migration en attente ({', '.join(pending)}) : lancez « flask db upgrade »")
+            return app
+        init_epoch()
+        init_search_index()
+        init_departments()
+        init_aggregates()
         create_default_admin()
 
+    # Historique différé : rejoue les spools laissés par un arrêt brutal
+    init_audit(app)
+
     return app
 
 
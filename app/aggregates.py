@@ -0,0 +1,177 @@
+from app.models import db, Employee, Department, StatsGlobal, StatsAnnee
+from app.cache import bump_data_version
+
+# Tolérance sur les sommes de salaires (cumul de flottants)
+SALAIRE_TOLERANCE = 0.01
+
+
+def _annee(date_embauche):
+    return date_embauche.strftime('%Y') if date_embauche else ''
+
+
+def _apply(delta, departement_id, salaire, date_embauche):
+    """Ajoute (delta=1) ou retire (delta=-1) un employé des agrégats, dans la transaction courante"""
+    _add(delta, delta * (salaire or 0), departement_id, _annee(date_embauche))
+
+
+def _add(count, salaire, departement_id, annee):
+    """Applique `count` employés totalisant `salaire` au groupe (departement_id, annee)"""
+    db.session.execute(
+        db.update(StatsGlobal).where(StatsGlobal.id == 1).values(
+            effectif=StatsGlobal.effectif + count,
+            salaire_total=StatsGlobal.salaire_total + salaire
+        )
+    )
+
+    if departement_id is not None:
+        # Ligne du département toujours présente : simple mise à jour
+        db.session.execute(
+            db.update(Department).where(Department.id == departement_id).values(
+                effectif=Department.effectif + count,
+                salaire_total=Department.salaire_total + salaire
+            )
+        )
+
+    _upsert(StatsAnnee, StatsAnnee.annee, annee,
+            StatsAnnee.embauches, count, salaire)
+
+
+def _upsert(model, key_column, key, count_column, count, salaire):
+    result = db.session.execute(
+        db.update(model).where(key_column == key).values({
+            count_column: count_column + count,
+            model.salaire_total: model.salaire_total + salaire
+        })
+    )
+    if result.rowcount == 0 and count > 0:
+        db.session.execute(db.insert(model).values({
+            key_column: key,
+            count_column: count,
+            model.salaire_total: salaire
+        }))
+    elif count < 0:
+        # Plus personne dans ce groupe : on retire la ligne (et le reliquat flottant)
+        db.session.execute(db.delete(model).where(key_column == key, count_column <= 0))
+
+
+def snapshot(employee):
+    """Valeurs utiles aux agrégats, à capturer avant une modification"""
+    return {
+        'departement_id': employee.departement_id,
+        'salaire': employee.salaire,
+        'date_embauche': employee.date_embauche
+    }
+
+
+def record_insert(employee):
+    _apply(1, **snapshot(employee))
+
+
+def record_delete(employee):
+    _apply(-1, **snapshot(employee))
+
+
+def record_update(old, employee):
+    """`old` est le snapshot pris avant la modification"""
+    new = snapshot(employee)
+    if new != old:
+        _apply(-1, **old)
+        _apply(1, **new)
+
+
+def record_bulk_insert(snapshots):
+    """Import en masse : les lignes sont regroupées avant mise à jour des agrégats"""
+    groups = {}
+    for snap in snapshots:
+        key = (snap['departement_id'], _annee(snap['date_embauche']))
+        count, salaire = groups.get(key, (0, 0))
+        groups[key] = (count + 1, salaire + (snap['salaire'] or 0))
+    for (departement_id, annee), (count, salaire) in groups.items():
+        _add(count, salaire, departement_id, annee)
+
+
+def compute_from_employees():
+    """Recalcule les agrégats depuis la table employees (référence)"""
+    effectif, salaire_total = db.session.query(
+        db.func.count(Employee.id), db.func.coalesce(db.func.sum(Employee.salaire), 0)
+    ).one()
+
+    depts = db.session.query(
+        Employee.departement_id, db.func.count(Employee.id), db.func.sum(Employee.salaire)
+    ).filter(Employee.departement_id.isnot(None)).group_by(Employee.departement_id).all()
+
+    annee = db.func.coalesce(db.func.strftime('%Y', Employee.date_embauche), '')
+    annees = db.session.query(
+        annee, db.func.count(Employee.id), db.func.sum(Employee.salaire)
+    ).group_by(annee).all()
+
+    return {
+        'global': (effectif, salaire_total or 0),
+        'departements': {d: (n, s or 0) for d, n, s in depts},
+        'annees': {a: (n, s or 0) for a, n, s in annees}
+    }
+
+
+def read_tables():
+    """Lit les agrégats tels qu'ils sont stockés"""
+    row = db.session.get(StatsGlobal, 1)
+    return {
+        'global': (row.effectif, row.salaire_total) if row else (0, 0),
+        'departements': {r.id: (r.effectif, r.salaire_total) for r in Department.query.all()},
+        'annees': {r.annee: (r.embauches, r.salaire_total) for r in StatsAnnee.query.all()}
+    }
+
+
+def verify_aggregates():
+    """Compare les tables d'agrégats au recalcul complet ; renvoie la liste des écarts"""
+    expected = compute_from_employees()
+    stored = read_tables()
+    errors = []
+
+    def compare(label, exp, got):
+        if exp[0] != got[0] or abs(exp[1] - got[1]) > SALAIRE_TOLERANCE:
+            errors.append(f"{label}: attendu {exp[0]} / {exp[1]:.2f}, stocké {got[0]} / {got[1]:.2f}")
+
+    compare('global', expected['global'], stored['global'])
+    for section in ('departements', 'annees'):
+        for key in sorted(set(expected[section]) | set(stored[section])):
+            compare(f"{section}[{key or '-'}]",
+                    expected[section].get(key, (0, 0)),
+                    stored[section].get(key, (0, 0)))
+    return errors
+
+
+def rebuild_aggregates():
+    """Reconstruit les tables d'agrégats (commit inclus)"""
+    data = compute_from_employees()
+
+    db.session.execute(db.delete(StatsGlobal))
+    db.session.execute(db.update(Department).values(effectif=0, salaire_total=0))
+    db.session.execute(db.delete(StatsAnnee))
+
+    effectif, salaire_total = data['global']
+    db.session.add(StatsGlobal(id=1, effectif=effectif, salaire_total=salaire_total))
+    for departement_id, (n, s) in data['departements'].items():
+        db.session.execute(db.update(Department).where(Department.id == departement_id).values(
+            effectif=n, salaire_total=s))
+    for annee, (n, s) in data['annees'].items():
+        db.session.add(StatsAnnee(annee=annee, embauches=n, salaire_total=s))
+
+    # Les vues en cache (en-tête de liste, tableau de bord) relisent les agrégats
+    bump_data_version()
+    db.session.commit()
+    return effectif
+
+
+def init_aggregates():
+    """Remplit les agrégats au premier démarrage (ou sur une base existante)"""
+    if db.session.get(StatsGlobal, 1) is None:
+        rebuild_aggregates()
+
+
+def global_stats():
+    """(effectif, salaire moyen, masse salariale) sans parcourir la table employees"""
+    row = db.session.get(StatsGlobal, 1)
+    if row is None or row.effectif <= 0:
+        return 0, 0, 0
+    return row.effectif, row.salaire_total / row.effectif, row.salaire_total
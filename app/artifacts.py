@@ -0,0 +1,175 @@
+import os
+import re
+import threading
+import time
+
+from flask import current_app
+
+from app.exports import (stream_csv, stream_ndjson, build_xlsx, build_parquet, build_arrow,
+                         columnar_available)
+from app.compression import available_encodings, compress_file, send_precompressed
+from app.cache import get_versions, EPOCH, EMPLOYEES
+
+# Cache disque des exports, indexé par l'époque de la base et la version des
+# données employés (compteur incrémenté à chaque écriture, voir app/cache.py) :
+# tant qu'aucun employé ne change, le même fichier est resservi tel quel via
+# send_file (sendfile côté gunicorn), avec ETag = format + époque + version et
+# Last-Modified. L'époque distingue une base recréée ou une autre base qui
+# partage le répertoire : sa version peut repasser par les mêmes valeurs.
+#
+# - Écriture dans un fichier temporaire puis os.replace : un lecteur ne voit
+#   jamais de fichier partiel, deux workers qui construisent le même export
+#   produisent le même contenu.
+# - Les formats texte (CSV, NDJSON) sont aussi stockés compressés (.gz, .br)
+#   une fois pour toutes ; Parquet et Arrow sont compressés en interne (zstd).
+# - Éviction par âge (EXPORT_CACHE_MAX_AGE) puis par taille totale
+#   (EXPORT_CACHE_MAX_BYTES), les plus anciens d'abord ; les fichiers de la
+#   version courante (même époque) sont conservés.
+
+# 'stream' : texte produit en flux (envoyé pendant l'écriture) ;
+# 'build' : fichier binaire construit en entier avant l'envoi.
+FORMATS = {
+    'csv': {'label': 'CSV', 'extension': 'csv', 'mimetype': 'text/csv', 'stream': stream_csv},
+    'ndjson': {'label': 'NDJSON', 'extension': 'ndjson', 'mimetype': 'application/x-ndjson',
+               'stream': stream_ndjson},
+    'excel': {'label': 'Excel', 'extension': 'xlsx', 'build': build_xlsx,
+              'mimetype': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'},
+    'parquet': {'label': 'Parquet', 'extension': 'parquet', 'mimetype': 'application/vnd.apache.parquet',
+                'build': build_parquet, 'columnar': True},
+    'arrow': {'label': 'Arrow', 'extension': 'arrow', 'mimetype': 'application/vnd.apache.arrow.file',
+              'build': build_arrow, 'columnar': True},
+}
+ARTIFACT_RE = re.compile(r'^huma_rh_(\d+)_v(\d+)\.(csv|ndjson|xlsx|parquet|arrow)')
+DOWNLOAD_NAME = 'huma_rh_export'
+
+
+def available_formats():
+    """Formats exportables ici (Parquet / Arrow seulement si pyarrow est installé)"""
+    return [name for name, spec in FORMATS.items() if not spec.get('columnar') or columnar_available()]
+
+
+def cache_dir(app=None):
+    app = app or current_app
+    return app.config.get('EXPORT_CACHE_DIR') or os.path.join(app.instance_path, 'export_cache')
+
+
+def export_version():
+    """(époque de la base, version des employés) lues en une requête"""
+    return tuple(get_versions(EPOCH, EMPLOYEES))
+
+
+def artifact_path(export_format, epoch, version, app=None):
+    return os.path.join(cache_dir(app), f"huma_rh_{epoch}_v{version}.{FORMATS[export_format]['extension']}")
+
+
+def _tmp_path(path):
+    return f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+
+def write_artifact(export_format, epoch, version, rows, app=None):
+    """Construit l'export de `rows` dans le cache ; renvoie son chemin"""
+    app = app or current_app
+    spec = FORMATS[export_format]
+    path = artifact_path(export_format, epoch, version, app)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = _tmp_path(path)
+    try:
+        if 'stream' in spec:
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                for chunk in spec['stream'](rows):
+                    f.write(chunk)
+        elif spec.get('columnar'):
+            with open(tmp_path, 'wb') as f:
+                spec['build'](rows, f, compression=app.config.get('EXPORT_COLUMNAR_COMPRESSION', 'zstd'))
+        else:
+            with open(tmp_path, 'wb') as f:
+                spec['build'](rows, f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def tee_artifact(export_format, epoch, version, chunks, on_complete=None):
+    """Relaie les morceaux d'un export texte au client tout en les écrivant dans
+    le cache ; le fichier n'est publié que si l'export est allé jusqu'au bout"""
+    path = artifact_path(export_format, epoch, version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = _tmp_path(path)
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(tmp_path, path)
+        if on_complete is not None:
+            on_complete(path)
+    finally:
+        # Client parti en cours de route : rien n'est publié
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def finalize_artifact(app, path):
+    """Variantes compressées des formats texte puis éviction (hors requête : peut
+    prendre quelques secondes)"""
+    match = ARTIFACT_RE.match(os.path.basename(path))
+    if path.endswith(('.csv', '.ndjson')) and os.path.exists(path):
+        for encoding in available_encodings():
+            level = app.config.get('EXPORT_CACHE_BROTLI_QUALITY' if encoding == 'br' else 'EXPORT_CACHE_GZIP_LEVEL')
+            compress_file(path, encoding, level)
+    evict_artifacts(app, keep_version=(int(match.group(1)), int(match.group(2))) if match else None)
+
+
+def send_artifact(export_format, epoch, version, path):
+    response = send_precompressed(
+        path, FORMATS[export_format]['mimetype'], etag=f'{export_format}-{epoch}-{version}',
+        as_attachment=True, download_name=f"{DOWNLOAD_NAME}.{FORMATS[export_format]['extension']}",
+        conditional=True,
+    )
+    response.cache_control.private = True
+    return response
+
+
+def list_artifacts(app=None):
+    """[((époque, version), chemin, taille, date de modification)] des fichiers du cache
+    (variantes comprises)"""
+    directory = cache_dir(app)
+    if not os.path.isdir(directory):
+        return []
+    artifacts = []
+    for name in os.listdir(directory):
+        match = ARTIFACT_RE.match(name)
+        if not match or name.endswith('.tmp'):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        artifacts.append(((int(match.group(1)), int(match.group(2))), path, stat.st_size, stat.st_mtime))
+    return artifacts
+
+
+def evict_artifacts(app, keep_version=None):
+    """Supprime les exports trop vieux, puis les plus anciens au-delà de la taille maximale
+    (keep_version : (époque, version) à conserver)"""
+    max_age = app.config.get('EXPORT_CACHE_MAX_AGE', 7 * 24 * 3600)
+    max_bytes = app.config.get('EXPORT_CACHE_MAX_BYTES', 500 * 1024 * 1024)
+    now = time.time()
+    artifacts = list_artifacts(app)
+    total = sum(a[2] for a in artifacts)
+    removed = []
+    for version, path, size, mtime in sorted(artifacts, key=lambda a: a[3]):
+        if version == keep_version:
+            continue
+        if now - mtime <= max_age and total <= max_bytes:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        removed.append(path)
+    return removed
@@ -0,0 +1,341 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import db, EmployeeHistory
+from app.cache import bump_data_version, HISTORY
+
+# Journal d'audit en écriture différée (optionnel, AUDIT_WRITE_BEHIND=1).
+#
+# Par défaut, log_action ajoute la ligne d'historique dans la transaction de
+# la requête (comportement d'origine). En mode différé :
+# - l'événement est mis de côté sur la session et écrit dans un fichier
+#   « spool » local (une ligne JSON par événement) juste avant le commit :
+#   un crash après le commit ne le perd pas ;
+# - une transaction annulée ajoute au spool une ligne d'annulation (ses
+#   événements ne seront pas rejoués) ; seul un crash pendant le commit
+#   lui-même peut rejouer l'historique d'une modification non validée ;
+# - après le commit, l'événement part dans une file bornée du processus ;
+# - un thread écrit les événements par lots, puis vide le spool dès que tout
+#   est en base ;
+# - file pleine ou écrivain indisponible : écriture synchrone immédiate ;
+# - à l'arrêt, la file est vidée ; après un crash, les spools orphelins sont
+#   rejoués au démarrage suivant (ou via 'flask audit-flush').
+
+PENDING_KEY = 'audit_pending'
+TX_KEY = 'audit_tx'
+SPOOL_PATTERN = 'audit-*.jsonl'
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _event(employee_id, user_id, action, changes):
+    return {
+        'employee_id': employee_id,
+        'user_id': user_id,
+        'action': action,
+        'changes': json.dumps(changes) if changes else None,
+        'timestamp': datetime.utcnow().isoformat(),
+    }
+
+
+def _row(event):
+    return dict(event, timestamp=datetime.fromisoformat(event['timestamp']))
+
+
+def _spool_lines(events, tx):
+    return ''.join(json.dumps(dict(e, tx=tx)) + '\n' for e in events)
+
+
+def _insert(conn, events):
+    conn.execute(db.insert(EmployeeHistory), [_row(e) for e in events])
+    # Écrit après le commit de l'employé : l'API doit voir l'historique changer
+    bump_data_version(HISTORY, connection=conn)
+
+
+def write_sync(events):
+    """Écrit des événements dans une transaction dédiée (hors session de la requête)"""
+    with db.engine.begin() as conn:
+        _insert(conn, events)
+
+
+def spool_dir(app):
+    return app.config.get('AUDIT_SPOOL_DIR') or os.path.join(app.instance_path, 'audit')
+
+
+class AuditWriter:
+    """File bornée + spool local + thread d'écriture par lots (un par processus)"""
+
+    def __init__(self, app):
+        self.app = app
+        self.pid = os.getpid()
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', 500)
+        self.interval = app.config.get('AUDIT_FLUSH_INTERVAL', 1.0)
+        self.fsync = app.config.get('AUDIT_SPOOL_FSYNC', False)
+        self.queue = queue.Queue(maxsize=app.config.get('AUDIT_QUEUE_SIZE', 10000))
+        self.lock = threading.Lock()
+        self.pending = 0  # événements dans le spool, pas encore en base
+        self.stopped = False
+
+        directory = spool_dir(app)
+        os.makedirs(directory, exist_ok=True)
+        self.spool_path = os.path.join(directory, f'audit-{self.pid}.jsonl')
+        self.spool = open(self.spool_path, 'a', encoding='utf-8')
+
+        self.thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self.thread.start()
+
+    def _append(self, lines):
+        try:
+            self.spool.write(lines)
+            self.spool.flush()
+            if self.fsync:
+                os.fsync(self.spool.fileno())
+        except OSError as e:
+            # Événements toujours écrits en base : seule la reprise après crash est perdue
+            self.app.logger.warning("⚠️ Spool d'audit inaccessible : %s", e)
+
+    def spool_events(self, events):
+        """Écrit les événements au spool avant le commit ; renvoie l'identifiant de la
+        transaction (None si l'écrivain est arrêté)"""
+        with self.lock:
+            if self.stopped:
+                return None
+            tx = uuid.uuid4().hex
+            self._append(_spool_lines(events, tx))
+            self.pending += len(events)
+        return tx
+
+    def cancel(self, tx, count):
+        """Transaction annulée : ses événements ne seront pas rejoués"""
+        with self.lock:
+            if not self.spool.closed:
+                self._append(json.dumps({'cancel': tx}) + '\n')
+            self._done(count)
+
+    def submit(self, events):
+        """Met en file des événements déjà au spool ; False si la file est pleine (à écrire en direct)"""
+        with self.lock:
+            if self.stopped:
+                return False
+            try:
+                self.queue.put_nowait(events)
+            except queue.Full:
+                return False
+        return True
+
+    def written(self, count):
+        """Événements du spool écrits en base hors de la file (repli synchrone)"""
+        with self.lock:
+            self._done(count)
+
+    def _done(self, count):
+        self.pending -= count
+        if self.pending == 0 and not self.spool.closed:
+            self.spool.truncate(0)
+
+    def _take(self):
+        """Attend un premier lot puis regroupe ce qui est déjà en file"""
+        try:
+            events = list(self.queue.get(timeout=self.interval))
+        except queue.Empty:
+            return []
+        while len(events) < self.batch_size:
+            try:
+                events.extend(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def _write(self, events):
+        delay = 0.05
+        while True:
+            try:
+                with self.app.app_context():
+                    write_sync(events)
+                break
+            except db.exc.SQLAlchemyError as e:
+                # Base verrouillée ou indisponible : les événements restent au spool
+                if self.stopped:
+                    self.app.logger.error("❌ Audit non écrit (%d événements, rejoués au démarrage) : %s",
+                                          len(events), e)
+                    return
+                time.sleep(delay)
+                delay = min(delay * 2, 5)
+        with self.lock:
+            self._done(len(events))
+
+    def _run(self):
+        while not self.stopped:
+            events = self._take()
+            if events:
+                self._write(events)
+
+    def flush(self):
+        """Écrit tout ce qui reste en file (appelé à l'arrêt)"""
+        while True:
+            events = self._take_nowait()
+            if not events:
+                break
+            self._write(events)
+
+    def _take_nowait(self):
+        events = []
+        while len(events) < self.batch_size:
+            try:
+                events.extend(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def stop(self):
+        with self.lock:
+            if self.stopped:
+                return
+            self.stopped = True
+        self.thread.join(timeout=self.interval + 5)
+        self.flush()
+        with self.lock:
+            self.spool.close()
+            if self.pending == 0:
+                os.remove(self.spool_path)
+
+
+def get_writer(app):
+    """Écrivain du processus courant, démarré à la première utilisation (après le fork gunicorn)"""
+    global _writer
+    if not app.config.get('AUDIT_WRITE_BEHIND'):
+        return None
+    with _writer_lock:
+        if _writer is None or _writer.pid != os.getpid():
+            _writer = AuditWriter(app)
+            atexit.register(_writer.stop)
+        return _writer
+
+
+def record_action(employee_id, user_id, action, changes=None):
+    """Enregistre une action dans l'historique (directement ou en différé selon la config)"""
+    if not current_app.config.get('AUDIT_WRITE_BEHIND'):
+        db.session.add(EmployeeHistory(**_row(_event(employee_id, user_id, action, changes))))
+        return
+    db.session.info['audit_app'] = current_app._get_current_object()
+    db.session.info.setdefault(PENDING_KEY, []).append(_event(employee_id, user_id, action, changes))
+
+
+@event.listens_for(Session, 'before_commit')
+def _spool_before_commit(session):
+    events = session.info.get(PENDING_KEY)
+    if not events or TX_KEY in session.info:
+        return
+    writer = get_writer(session.info['audit_app'])
+    if writer is not None:
+        session.info[TX_KEY] = writer.spool_events(events)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_after_commit(session):
+    events = session.info.pop(PENDING_KEY, None)
+    app = session.info.pop('audit_app', None)
+    tx = session.info.pop(TX_KEY, None)
+    if not events:
+        return
+    writer = get_writer(app)
+    if writer is None or not writer.submit(events):
+        # Repli synchrone : file pleine ou mode désactivé entre-temps
+        with app.app_context():
+            write_sync(events)
+        if writer is not None and tx is not None:
+            writer.written(len(events))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    events = session.info.pop(PENDING_KEY, None)
+    app = session.info.pop('audit_app', None)
+    tx = session.info.pop(TX_KEY, None)
+    if tx is not None:
+        get_writer(app).cancel(tx, len(events))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _missing(events):
+    """Écarte les événements déjà en base (crash entre le commit et le vidage du spool)"""
+    timestamps = {_row(e)['timestamp'] for e in events}
+    existing = set()
+    timestamps = list(timestamps)
+    for i in range(0, len(timestamps), 500):
+        existing.update(db.session.execute(
+            db.select(EmployeeHistory.employee_id, EmployeeHistory.action, EmployeeHistory.timestamp)
+            .where(EmployeeHistory.timestamp.in_(timestamps[i:i + 500]))
+        ).tuples())
+    return [e for e in events
+            if (e['employee_id'], e['action'], _row(e)['timestamp']) not in existing]
+
+
+def recover_spools(app):
+    """Rejoue les spools laissés par des processus arrêtés ; renvoie le nombre d'événements écrits"""
+    recovered = 0
+    for path in glob.glob(os.path.join(spool_dir(app), SPOOL_PATTERN)):
+        name = os.path.basename(path)
+        try:
+            pid = int(name[len('audit-'):].split('.')[0])
+        except ValueError:
+            continue
+        if pid == os.getpid() or _pid_alive(pid):
+            continue
+        # Le renommage réserve le fichier : un seul worker le rejoue (et un
+        # rejeu interrompu sera repris, le fichier portant le pid du repreneur)
+        claimed = os.path.join(os.path.dirname(path), f'audit-{os.getpid()}.replay-{name}')
+        try:
+            os.rename(path, claimed)
+        except OSError:
+            continue
+        with open(claimed, encoding='utf-8') as f:
+            # Une dernière ligne tronquée (crash pendant l'écriture) est ignorée
+            events, cancelled = [], set()
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if 'cancel' in entry:
+                    cancelled.add(entry['cancel'])
+                else:
+                    events.append(entry)
+        events = [{k: v for k, v in e.items() if k != 'tx'} for e in events if e.get('tx') not in cancelled]
+        events = _missing(events)
+        for i in range(0, len(events), 1000):
+            write_sync(events[i:i + 1000])
+        recovered += len(events)
+        os.remove(claimed)
+    return recovered
+
+
+def init_audit(app):
+    """Au démarrage en mode différé : rejoue les spools orphelins"""
+    if not app.config.get('AUDIT_WRITE_BEHIND'):
+        return
+    with app.app_context():
+        count = recover_spools(app)
+    if count:
+        print(f"✅ Audit : {count} événements récupérés depuis le spool")
@@ -0,0 +1,209 @@
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+
+from app.models import db, DataVersion
+from app.cache import init_epoch, EMPLOYEES, HISTORY, DEPARTMENTS, EPOCH
+from app.user_cache import invalidate_user
+
+# Sauvegardes à chaud via l'API de backup de SQLite : la base est copiée par
+# paquets de pages, le verrou est relâché entre deux paquets, les écritures
+# continuent pendant la copie (et la copie reste cohérente, contrairement à
+# un shutil.copy2 du fichier en cours d'écriture, surtout en WAL).
+#
+# Chaque sauvegarde est vérifiée (PRAGMA integrity_check), compressée en gzip
+# et accompagnée d'une empreinte SHA-256 (fichier .sha256).
+
+BACKUP_RE = re.compile(r'^huma_rh_(\d{8}_\d{6})\.db(\.gz)?$')
+TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S'
+
+
+class BackupError(Exception):
+    pass
+
+
+def database_path():
+    if db.engine.dialect.name != 'sqlite' or not db.engine.url.database:
+        raise BackupError("Sauvegarde disponible uniquement pour une base SQLite fichier")
+    return db.engine.url.database
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _integrity_errors(path):
+    conn = sqlite3.connect(path)
+    try:
+        rows = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    finally:
+        conn.close()
+    return [] if rows == ['ok'] else rows
+
+
+def copy_database(source_path, target_path, pages=256, sleep=0.005):
+    """Copie en ligne, par paquets de `pages` pages, vers un fichier autonome"""
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target, pages=pages, sleep=sleep)
+        # La copie hérite du mode WAL : on la ramène à un fichier unique
+        target.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        target.close()
+        source.close()
+
+
+def create_backup(backup_dir, compress=True, pages=256, sleep=0.005):
+    """Sauvegarde la base courante ; renvoie le chemin du fichier créé"""
+    source_path = database_path()
+    os.makedirs(backup_dir, exist_ok=True)
+    name = f"huma_rh_{datetime.now().strftime(TIMESTAMP_FORMAT)}.db"
+    path = os.path.join(backup_dir, name + ('.gz' if compress else ''))
+
+    fd, tmp_path = tempfile.mkstemp(suffix='.db', dir=backup_dir)
+    os.close(fd)
+    try:
+        copy_database(source_path, tmp_path, pages=pages, sleep=sleep)
+        errors = _integrity_errors(tmp_path)
+        if errors:
+            raise BackupError(f"Copie corrompue : {'; '.join(errors[:5])}")
+        if compress:
+            with open(tmp_path, 'rb') as src, gzip.open(path + '.tmp', 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(path + '.tmp', path)
+        else:
+            os.replace(tmp_path, path)
+    finally:
+        for leftover in (tmp_path, path + '.tmp'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    with open(path + '.sha256', 'w') as f:
+        f.write(f"{_sha256(path)}  {os.path.basename(path)}\n")
+    return path
+
+
+def list_backups(backup_dir):
+    """[(date, chemin)] du plus récent au plus ancien"""
+    if not os.path.isdir(backup_dir):
+        return []
+    backups = []
+    for name in os.listdir(backup_dir):
+        match = BACKUP_RE.match(name)
+        if match:
+            backups.append((datetime.strptime(match.group(1), TIMESTAMP_FORMAT),
+                            os.path.join(backup_dir, name)))
+    return sorted(backups, reverse=True)
+
+
+def _extract(path, target_path):
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as src, open(target_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    else:
+        shutil.copyfile(path, target_path)
+
+
+def verify_backup(path):
+    """Renvoie la liste des problèmes (vide si la sauvegarde est saine)"""
+    errors = []
+    checksum_path = path + '.sha256'
+    if os.path.exists(checksum_path):
+        with open(checksum_path) as f:
+            expected = f.read().split()[0]
+        if _sha256(path) != expected:
+            return ["Empreinte SHA-256 différente : fichier altéré"]
+    else:
+        errors.append("Fichier .sha256 absent")
+
+    fd, tmp_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        _extract(path, tmp_path)
+        errors.extend(_integrity_errors(tmp_path))
+    except (OSError, EOFError) as e:
+        errors.append(f"Lecture impossible : {e}")
+    finally:
+        os.remove(tmp_path)
+    return errors
+
+
+def rotate_backups(backup_dir, hourly=24, daily=7, weekly=4):
+    """Garde la plus récente sauvegarde de chacune des `hourly` dernières heures,
+    des `daily` derniers jours et des `weekly` dernières semaines ; supprime le reste.
+    Renvoie les fichiers supprimés."""
+    rules = [
+        (hourly, lambda d: d.strftime('%Y%m%d%H')),
+        (daily, lambda d: d.strftime('%Y%m%d')),
+        (weekly, lambda d: '%d-%02d' % d.isocalendar()[:2]),
+    ]
+    keep = set()
+    for limit, bucket in rules:
+        seen = set()
+        for date, path in list_backups(backup_dir):
+            key = bucket(date)
+            if key not in seen and len(seen) < limit:
+                seen.add(key)
+                keep.add(path)
+
+    removed = []
+    for _, path in list_backups(backup_dir):
+        if path not in keep:
+            os.remove(path)
+            if os.path.exists(path + '.sha256'):
+                os.remove(path + '.sha256')
+            removed.append(path)
+    return removed
+
+
+def _data_versions():
+    return dict(db.session.query(DataVersion.name, DataVersion.version).all())
+
+
+def restore_backup(path, pages=256, sleep=0.005):
+    """Remplace le contenu de la base courante par celui d'une sauvegarde vérifiée"""
+    errors = verify_backup(path)
+    if [e for e in errors if e != "Fichier .sha256 absent"]:
+        raise BackupError(f"Sauvegarde invalide : {'; '.join(errors[:5])}")
+
+    target_path = database_path()
+    before = _data_versions()
+    fd, tmp_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    db.session.remove()
+    db.engine.dispose()
+    try:
+        _extract(path, tmp_path)
+        # Écrit page à page dans la base vivante, avec ses verrous (WAL compris)
+        copy_source = sqlite3.connect(tmp_path)
+        target = sqlite3.connect(target_path, timeout=30)
+        try:
+            copy_source.backup(target, pages=pages, sleep=sleep)
+        finally:
+            target.close()
+            copy_source.close()
+    finally:
+        os.remove(tmp_path)
+
+    # Caches partagés (vues, exports, ETag) : les versions restaurées sont
+    # anciennes ; chacune repart au-dessus de la plus grande des deux bases,
+    # jamais sur une valeur déjà servie
+    restored = _data_versions()
+    for name in ({EMPLOYEES, HISTORY, DEPARTMENTS} | set(before) | set(restored)) - {EPOCH}:
+        db.session.merge(DataVersion(name=name, version=max(before.get(name, 0), restored.get(name, 0)) + 1))
+    db.session.commit()
+    # Sauvegarde antérieure à l'époque : elle en reçoit une nouvelle
+    init_epoch()
+    invalidate_user()
@@ -0,0 +1,155 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+from app.models import db, DataVersion
+
+# Cache partagé entre workers gunicorn : un petit fichier SQLite local.
+# Chaque entrée est marquée avec la version des données employés ; toute
+# écriture sur un employé incrémente cette version, ce qui invalide d'un coup
+# toutes les entrées (aucune expiration à gérer, aucun service externe).
+# Les clés sont préfixées par l'époque de la base : deux bases (ou une base
+# recréée) qui partagent le fichier de cache ne se mélangent pas.
+
+EMPLOYEES = 'employees'
+# Historique écrit hors transaction employé (audit différé, voir app/audit.py)
+HISTORY = 'history'
+# Liste des départements (codes, libellés) : change rarement, cache à part
+DEPARTMENTS = 'departments'
+# Identifiant aléatoire de la base, tiré à sa création (pas une version)
+EPOCH = 'epoch'
+
+_local = threading.local()
+_lock = threading.Lock()
+_memory = {}  # cache de 1er niveau du processus : clé -> (version, valeur)
+_counters = {'memory_hits': 0, 'shared_hits': 0, 'misses': 0, 'errors': 0}
+
+
+def bump_data_version(name=EMPLOYEES, connection=None):
+    """Incrémente la version des données, dans la transaction en cours
+    (celle de la session, ou de `connection` si fournie)"""
+    executor = connection if connection is not None else db.session
+    result = executor.execute(
+        db.update(DataVersion).where(DataVersion.name == name).values(version=DataVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        executor.execute(db.insert(DataVersion).values(name=name, version=1))
+
+
+def get_data_version(name=EMPLOYEES):
+    version = db.session.query(DataVersion.version).filter(DataVersion.name == name).scalar()
+    return version or 0
+
+
+def init_epoch():
+    """Tire l'époque de la base si elle n'en a pas encore"""
+    if db.session.get(DataVersion, EPOCH) is None:
+        db.session.add(DataVersion(name=EPOCH, version=random.randint(1, 2**31 - 1)))
+        db.session.commit()
+
+
+def get_epoch():
+    return get_data_version(EPOCH)
+
+
+def get_versions(*names):
+    """Versions de plusieurs données en une seule requête (0 si absente)"""
+    rows = dict(db.session.query(DataVersion.name, DataVersion.version).filter(DataVersion.name.in_(names)).all())
+    return [rows.get(name) or 0 for name in names]
+
+
+def _cache_path():
+    path = current_app.config.get('CACHE_DB_PATH')
+    if not path:
+        path = os.path.join(current_app.instance_path, 'cache.db')
+    return path
+
+
+def _connection():
+    """Une connexion au fichier de cache par thread"""
+    path = _cache_path()
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'path', None) != path:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = sqlite3.connect(path, timeout=1, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        _local.conn = conn
+        _local.path = path
+    return conn
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def cache_get(key, version):
+    entry = _memory.get(key)
+    if entry is not None and entry[0] == version:
+        _count('memory_hits')
+        return entry[1]
+
+    try:
+        row = _connection().execute(
+            'SELECT value FROM cache WHERE key = ? AND version = ?', (key, version)
+        ).fetchone()
+    except sqlite3.Error:
+        _count('errors')
+        row = None
+    if row is None:
+        _count('misses')
+        return None
+
+    value = json.loads(row[0])
+    _memory[key] = (version, value)
+    _count('shared_hits')
+    return value
+
+
+def cache_set(key, version, value):
+    _memory[key] = (version, value)
+    try:
+        _connection().execute(
+            'INSERT OR REPLACE INTO cache (key, version, value, created_at) VALUES (?, ?, ?, ?)',
+            (key, version, json.dumps(value, default=str), time.time())
+        )
+    except sqlite3.Error:
+        # Cache en « best effort » : une base verrouillée ne doit pas casser la page
+        _count('errors')
+
+
+def cached(key, builder, name=EMPLOYEES):
+    """Renvoie la valeur en cache pour la version courante, sinon la calcule via builder()"""
+    if not current_app.config.get('CACHE_ENABLED', True):
+        return builder()
+    epoch, version = get_versions(EPOCH, name)
+    key = f'{epoch}:{key}'
+    value = cache_get(key, version)
+    if value is None:
+        value = builder()
+        cache_set(key, version, value)
+    return value
+
+
+def cache_stats():
+    """Compteurs du processus courant (succès mémoire / fichier partagé, échecs)"""
+    with _lock:
+        stats = dict(_counters)
+    lookups = stats['memory_hits'] + stats['shared_hits'] + stats['misses']
+    stats['hit_ratio'] = round((lookups - stats['misses']) / lookups, 3) if lookups else None
+    stats['pid'] = os.getpid()
+    return stats
@@ -0,0 +1,221 @@
+import csv
+import os
+import sys
+
+import click
+import numpy as np
+
+from app.search import rebuild_search_index
+from app.aggregates import verify_aggregates, rebuild_aggregates
+from app.importer import import_employees, read_rows, ImportFileError, IMPORT_BATCH_SIZE
+from app.models import User, Employee, Department
+from app.departments import create_department, rename_department
+from app.plans import check_query_plans, seed_employees
+from app.audit import recover_spools
+from app.snapshot import get_snapshot
+from app.backup import (create_backup, list_backups, verify_backup, rotate_backups, restore_backup,
+                        BackupError)
+
+
+def register_commands(app):
+    """Enregistre les commandes utilitaires (flask <commande>)"""
+
+    @app.cli.command('search-rebuild')
+    def search_rebuild_command():
+        """Reconstruit l'index de recherche plein texte"""
+        count = rebuild_search_index()
+        if count is None:
+            print("ℹ️ Index plein texte indisponible (moteur non SQLite ou FTS5 absent) : recherche LIKE utilisée")
+        else:
+            print(f"✅ Index de recherche reconstruit ({count} employés)")
+
+    @app.cli.command('stats-verify')
+    def stats_verify_command():
+        """Vérifie les tables d'agrégats contre un recalcul complet"""
+        errors = verify_aggregates()
+        if errors:
+            for error in errors:
+                print(f"❌ {error}")
+            print("👉 Lancer 'flask stats-rebuild' pour corriger")
+            sys.exit(1)
+        print("✅ Agrégats cohérents")
+
+    @app.cli.command('stats-rebuild')
+    def stats_rebuild_command():
+        """Reconstruit les tables d'agrégats depuis la table employees"""
+        count = rebuild_aggregates()
+        print(f"✅ Agrégats reconstruits ({count} employés)")
+
+    @app.cli.command('stats')
+    @click.option('--departement', help='Limite les statistiques à un département')
+    @click.option('--salaire-min', type=float, help='Salaire minimum')
+    def stats_command(departement, salaire_min):
+        """Affiche les statistiques rapides (instantané en mémoire)"""
+        snapshot = get_snapshot()
+        mask = snapshot.mask(departement=departement, salaire_min=salaire_min)
+        salaires = snapshot.salaire[mask]
+        if len(salaires) == 0:
+            print("ℹ️ Aucun employé")
+            return
+        print(f"📊 STATS: {len(salaires)} employés | Moyenne: {salaires.mean():.0f}€ | "
+              f"Médiane: {float(np.median(salaires)):.0f}€ | Masse salariale: {salaires.sum():.0f}€")
+        for name, count, total in snapshot.by_departement(mask):
+            print(f"  {name or '-':<20} {count:>8} employés | Moyenne: {total / count:.0f}€")
+
+    @app.cli.command('departements')
+    def departements_command():
+        """Liste les départements avec leurs effectifs"""
+        for dept in Department.query.order_by(Department.libelle):
+            moyenne = f"{dept.salaire_total / dept.effectif:.0f}€" if dept.effectif else '-'
+            print(f"  {dept.code:<15} {dept.libelle:<25} {dept.effectif:>8} employés | Moyenne: {moyenne}")
+
+    @app.cli.command('departement-ajouter')
+    @click.argument('code')
+    @click.option('--libelle', help='Libellé affiché (par défaut le code)')
+    def departement_ajouter_command(code, libelle):
+        """Crée un département (proposé dans les formulaires et les imports)"""
+        if Department.query.filter_by(code=code).first() is not None:
+            print(f"❌ Département déjà existant : {code}")
+            sys.exit(1)
+        department = create_department(code, libelle)
+        print(f"✅ Département {department.code} créé ({department.libelle})")
+
+    @app.cli.command('departement-renommer')
+    @click.argument('code')
+    @click.argument('libelle')
+    def departement_renommer_command(code, libelle):
+        """Change le libellé d'un département (le code reste stable)"""
+        department = Department.query.filter_by(code=code).first()
+        if department is None:
+            print(f"❌ Département inconnu : {code}")
+            sys.exit(1)
+        rename_department(department, libelle)
+        print(f"✅ {code} renommé en {libelle}")
+
+    @app.cli.command('import-employees')
+    @click.argument('fichier', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--user', 'username', default='admin', help="Utilisateur inscrit dans l'historique")
+    @click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help='Lignes par transaction')
+    @click.option('--report', 'report_path', type=click.Path(dir_okay=False), help='Écrit les erreurs dans un CSV')
+    def import_employees_command(fichier, username, batch_size, report_path):
+        """Importe des employés depuis un fichier CSV ou XLSX"""
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            print(f"❌ Utilisateur inconnu : {username}")
+            sys.exit(1)
+
+        try:
+            with open(fichier, 'rb') as stream:
+                report = import_employees(read_rows(stream, fichier), user.id, batch_size=batch_size)
+        except ImportFileError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+
+        print(f"✅ {report.inserted} employé(s) importé(s) sur {report.total}")
+        if report.errors:
+            print(f"⚠️ {len(report.errors)} ligne(s) rejetée(s)")
+            if report_path:
+                with open(report_path, 'w', newline='', encoding='utf-8') as out:
+                    writer = csv.writer(out)
+                    writer.writerow(['Ligne', 'Erreurs'])
+                    for line, messages in report.errors:
+                        writer.writerow([line, ' | '.join(messages)])
+                print(f"📄 Rapport d'erreurs : {report_path}")
+            else:
+                for line, messages in report.errors[:20]:
+                    print(f"  ligne {line} : {' | '.join(messages)}")
+
+    @app.cli.command('check-plans')
+    @click.option('--seed', 'seed_count', type=int, default=0,
+                  help="Remplit d'abord une base VIDE avec N employés factices")
+    @click.option('--verbose', is_flag=True, help='Affiche toutes les requêtes et leur plan')
+    def check_plans_command(seed_count, verbose):
+        """Vérifie (EXPLAIN QUERY PLAN) qu'aucune requête des pages clés ne parcourt une table entière"""
+        if seed_count:
+            if Employee.query.first() is not None:
+                print("❌ --seed n'est possible que sur une base vide")
+                sys.exit(1)
+            seed_employees(seed_count)
+            rebuild_aggregates()
+            rebuild_search_index()
+            print(f"🌱 {seed_count} employés factices créés")
+
+        results = check_query_plans(app)
+        failures = [r for r in results if r[3]]
+        for url, statement, plan, scans in results:
+            if scans or verbose:
+                print(f"{'❌' if scans else '✅'} {url}")
+                print(f"   {' '.join(statement.split())}")
+                for detail in plan:
+                    print(f"     {detail}")
+        if failures:
+            print(f"❌ {len(failures)} requête(s) sur {len(results)} parcourent une table entière")
+            sys.exit(1)
+        print(f"✅ {len(results)} requêtes contrôlées, aucun parcours complet de table")
+
+    @app.cli.command('audit-flush')
+    def audit_flush_command():
+        """Rejoue les spools d'audit laissés par des processus arrêtés"""
+        count = recover_spools(app)
+        print(f"✅ {count} événement(s) d'audit écrit(s) depuis les spools")
+
+    def backup_dir():
+        return app.config.get('BACKUP_DIR') or os.path.join(app.instance_path, 'backups')
+
+    @app.cli.command('backup')
+    @click.option('--no-compress', is_flag=True, help='Copie non compressée (.db)')
+    @click.option('--no-rotate', is_flag=True, help='Ne supprime aucune ancienne sauvegarde')
+    def backup_command(no_compress, no_rotate):
+        """Sauvegarde à chaud la base (vérifiée, compressée) puis applique la rotation"""
+        try:
+            path = create_backup(backup_dir(), compress=not no_compress,
+                                 pages=app.config['BACKUP_STEP_PAGES'], sleep=app.config['BACKUP_STEP_SLEEP'])
+        except BackupError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ Backup créé : {path} ({os.path.getsize(path) / 1024:.0f} Ko)")
+        if not no_rotate:
+            removed = rotate_backups(backup_dir(), hourly=app.config['BACKUP_KEEP_HOURLY'],
+                                     daily=app.config['BACKUP_KEEP_DAILY'],
+                                     weekly=app.config['BACKUP_KEEP_WEEKLY'])
+            for path in removed:
+                print(f"🗑️ Supprimé (rotation) : {os.path.basename(path)}")
+
+    @app.cli.command('backup-list')
+    def backup_list_command():
+        """Liste les sauvegardes, de la plus récente à la plus ancienne"""
+        backups = list_backups(backup_dir())
+        if not backups:
+            print("ℹ️ Aucune sauvegarde")
+        for date, path in backups:
+            print(f"  {date:%d/%m/%Y %H:%M:%S}  {os.path.getsize(path) / 1024:9.0f} Ko  {os.path.basename(path)}")
+
+    @app.cli.command('backup-verify')
+    @click.argument('fichier', required=False, type=click.Path(exists=True, dir_okay=False))
+    def backup_verify_command(fichier):
+        """Vérifie une sauvegarde (ou toutes) : empreinte SHA-256 et intégrité SQLite"""
+        paths = [fichier] if fichier else [path for _, path in list_backups(backup_dir())]
+        failures = 0
+        for path in paths:
+            errors = verify_backup(path)
+            if errors:
+                failures += 1
+                print(f"❌ {os.path.basename(path)} : {'; '.join(errors[:5])}")
+            else:
+                print(f"✅ {os.path.basename(path)}")
+        if failures:
+            sys.exit(1)
+
+    @app.cli.command('backup-restore')
+    @click.argument('fichier', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--yes', is_flag=True, help='Ne pas demander de confirmation')
+    def backup_restore_command(fichier, yes):
+        """Restaure une sauvegarde à la place de la base courante"""
+        if not yes:
+            click.confirm(f"⚠️ Remplacer toutes les données par {os.path.basename(fichier)} ?", abort=True)
+        try:
+            restore_backup(fichier, pages=app.config['BACKUP_STEP_PAGES'], sleep=app.config['BACKUP_STEP_SLEEP'])
+        except BackupError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ Base restaurée depuis {fichier}")
@@ -0,0 +1,206 @@
+import os
+import threading
+import time
+import zlib
+
+from flask import g, request, send_file
+
+try:
+    import brotli
+except ImportError:  # optionnel : gzip seul
+    brotli = None
+
+# Compression des réponses à la volée (COMPRESSION=0 pour désactiver) :
+# - encodage négocié sur Accept-Encoding : brotli si disponible, sinon gzip ;
+# - réponses en flux (export CSV) compressées bloc par bloc, sans tout
+#   garder en mémoire ;
+# - corps trop petits, types déjà compressés (xlsx, images), 206/304 : intacts ;
+# - ETag suffixé par l'encodage (-gzip / -br) : chaque représentation garde un
+#   ETag fort distinct (voir matching_etag) ;
+# - send_precompressed sert directement un fichier .gz / .br déjà produit.
+# Coût mesuré par processus (compression_stats) et par requête (Server-Timing).
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/csv', 'text/plain', 'text/css', 'text/javascript',
+    'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+_lock = threading.Lock()
+_counters = {'responses': 0, 'streamed': 0, 'skipped_small': 0,
+             'bytes_in': 0, 'bytes_out': 0, 'cpu_seconds': 0.0}
+
+
+def available_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate(accept_encodings, encodings=None):
+    """Meilleur encodage accepté par le client, None si aucun (q=0 = refusé)"""
+    best, best_quality = None, 0
+    for encoding in encodings or available_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def matching_etag(etag):
+    """ETag envoyé par le client (If-None-Match) qui désigne `etag`, quel que
+    soit l'encodage de la représentation qu'il a reçue ; None sinon"""
+    for candidate in [etag] + [f'{etag}-{encoding}' for encoding in SUFFIXES]:
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding, config):
+        if encoding == 'br':
+            self._obj = brotli.Compressor(quality=config.get('COMPRESSION_BROTLI_QUALITY', 4))
+            self.compress, self.finish = self._obj.process, self._obj.finish
+        else:
+            # wbits 31 : en-tête et somme de contrôle gzip
+            self._obj = zlib.compressobj(config.get('COMPRESSION_GZIP_LEVEL', 6), zlib.DEFLATED, 31)
+            self.compress, self.finish = self._obj.compress, self._obj.flush
+
+
+def _record(bytes_in, bytes_out, cpu, streamed=False):
+    with _lock:
+        _counters['responses'] += 1
+        _counters['streamed'] += int(streamed)
+        _counters['bytes_in'] += bytes_in
+        _counters['bytes_out'] += bytes_out
+        _counters['cpu_seconds'] += cpu
+
+
+def _request_stats():
+    """Mesures de la requête, reprises par l'instrumentation si elle est active"""
+    perf = g.get('perf')
+    if perf is None:
+        return {}
+    return perf.setdefault('compress', {'time': 0.0, 'bytes_in': 0, 'bytes_out': 0})
+
+
+def _compress_stream(chunks, original, compressor, stats):
+    bytes_in = bytes_out = 0
+    cpu = 0.0
+    try:
+        for chunk in chunks:
+            started = time.thread_time()
+            data = compressor.compress(chunk)
+            cpu += time.thread_time() - started
+            bytes_in += len(chunk)
+            if data:
+                bytes_out += len(data)
+                yield data
+        started = time.thread_time()
+        data = compressor.finish()
+        cpu += time.thread_time() - started
+        bytes_out += len(data)
+        yield data
+    finally:
+        if hasattr(original, 'close'):
+            original.close()
+        _record(bytes_in, bytes_out, cpu, streamed=True)
+        stats.update(time=stats.get('time', 0.0) + cpu, bytes_in=bytes_in, bytes_out=bytes_out)
+
+
+def _should_skip(response):
+    return (request.method == 'HEAD'
+            or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or 'Content-Range' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES)
+
+
+def compress_response(response, config):
+    """Compresse `response` selon Accept-Encoding (sur place) ; la renvoie"""
+    if _should_skip(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    compressor = _Compressor(encoding, config)
+    stats = _request_stats()
+    if response.is_streamed or response.direct_passthrough:
+        original = response.response
+        response.response = _compress_stream(response.iter_encoded(), original, compressor, stats)
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < config.get('COMPRESSION_MIN_SIZE', 1024):
+            with _lock:
+                _counters['skipped_small'] += 1
+            return response
+        started = time.thread_time()
+        data = compressor.compress(body) + compressor.finish()
+        cpu = time.thread_time() - started
+        response.set_data(data)
+        _record(len(body), len(data), cpu)
+        stats.update(time=stats.get('time', 0.0) + cpu, bytes_in=len(body), bytes_out=len(data))
+
+    response.headers['Content-Encoding'] = encoding
+    response.headers.pop('Accept-Ranges', None)
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak=weak)
+    return response
+
+
+def compress_file(path, encoding, level, chunk_size=1024 * 1024):
+    """Écrit la variante compressée de `path` (path.gz / path.br) ; renvoie son chemin"""
+    config = {'COMPRESSION_GZIP_LEVEL': level, 'COMPRESSION_BROTLI_QUALITY': level}
+    compressor = _Compressor(encoding, config)
+    target = path + SUFFIXES[encoding]
+    tmp_path = f'{target}.{os.getpid()}.tmp'
+    try:
+        with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(chunk_size), b''):
+                dst.write(compressor.compress(chunk))
+            dst.write(compressor.finish())
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return target
+
+
+def send_precompressed(path, mimetype, etag=True, **kwargs):
+    """send_file de `path`, ou de sa variante .br / .gz déjà compressée si le
+    client l'accepte : aucun coût CPU par téléchargement"""
+    encodings = [e for e in available_encodings() if os.path.exists(path + SUFFIXES[e])]
+    encoding = negotiate(request.accept_encodings, encodings) if encodings else None
+    if encoding is None:
+        return send_file(path, mimetype=mimetype, etag=etag, **kwargs)
+    # ETag propre à la variante compressée (fichier distinct, ou suffixe -gzip / -br)
+    if isinstance(etag, str):
+        etag = f'{etag}-{encoding}'
+    response = send_file(path + SUFFIXES[encoding], mimetype=mimetype, etag=etag, **kwargs)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def compression_stats():
+    """Octets avant / après et temps CPU de compression du processus courant"""
+    with _lock:
+        stats = dict(_counters)
+    stats['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 3) if stats['bytes_in'] else None
+    stats['cpu_seconds'] = round(stats['cpu_seconds'], 3)
+    stats['encodings'] = available_encodings()
+    stats['pid'] = os.getpid()
+    return stats
+
+
+def init_compression(app):
+    """Compresse les réponses si COMPRESSION_ENABLED est activé"""
+    if not app.config.get('COMPRESSION_ENABLED'):
+        return
+
+    @app.after_request
+    def compress(response):
+        return compress_response(response, app.config)
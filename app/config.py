@@ -8,7 +8,79 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///huma_rh.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     WTF_CSRF_ENABLED = True
+    # Profil SQLite concurrent : WAL, busy_timeout, cache, pool (voir app/database.py)
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', '1') == '1'
+    SQLITE_BUSY_TIMEOUT_MS = 5000
+    SQLITE_CACHE_SIZE_KB = 16000
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+    SQLITE_POOL_SIZE = 5
+    SQLITE_POOL_OVERFLOW = 5
+    SQLITE_WRITE_RETRIES = 3
     PERMANENT_SESSION_LIFETIME = 7200  # 2 heures
+    # Cache partagé entre workers (par défaut : instance/cache.db)
+    CACHE_ENABLED = True
+    CACHE_DB_PATH = os.environ.get('CACHE_DB_PATH')
+    # Instantané des employés en mémoire pour les stats (voir app/snapshot.py) :
+    # marge de relecture sur updated_at (secondes), part de lignes modifiées
+    # au-delà de laquelle l'instantané est reconstruit en entier
+    SNAPSHOT_OVERLAP = 60
+    SNAPSHOT_REBUILD_RATIO = 0.2
+    # Compression des réponses, gzip ou brotli selon le client (voir app/compression.py) ;
+    # niveaux bas = moins de CPU par requête (mesure : python -m benchmarks.compression)
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION', '1') == '1'
+    COMPRESSION_MIN_SIZE = 1024      # octets : en dessous, envoyé tel quel
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+    # Exports en arrière-plan (voir app/jobs.py) : threads par worker, tâches
+    # oubliées après EXPORT_JOB_TTL secondes (par défaut instance/export_jobs.db)
+    EXPORT_JOB_WORKERS = 1
+    EXPORT_JOB_TTL = 3600
+    EXPORT_JOBS_DB_PATH = os.environ.get('EXPORT_JOBS_DB_PATH')
+    # Cache disque des exports par version des données (voir app/artifacts.py ;
+    # par défaut instance/export_cache) : éviction par âge puis par taille
+    EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR')
+    EXPORT_CACHE_MAX_AGE = 7 * 24 * 3600
+    EXPORT_CACHE_MAX_BYTES = 500 * 1024 * 1024
+    EXPORT_CACHE_GZIP_LEVEL = 9          # compression faite une fois par version
+    EXPORT_CACHE_BROTLI_QUALITY = 6
+    # Compression interne des exports Parquet / Arrow (zstd, lz4 ou None)
+    EXPORT_COLUMNAR_COMPRESSION = 'zstd'
+    # Mesures par requête : SQL, rendu, Server-Timing (voir app/instrumentation.py)
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION') == '1'
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 10))
+    # Historique écrit en différé, par lots (voir app/audit.py)
+    AUDIT_WRITE_BEHIND = os.environ.get('AUDIT_WRITE_BEHIND') == '1'
+    AUDIT_SPOOL_DIR = os.environ.get('AUDIT_SPOOL_DIR')  # par défaut : instance/audit
+    AUDIT_QUEUE_SIZE = 10000
+    AUDIT_BATCH_SIZE = 500
+    AUDIT_FLUSH_INTERVAL = 1.0
+    # Spool écrit avant chaque commit ; fsync : survit aussi à une panne de la machine
+    AUDIT_SPOOL_FSYNC = os.environ.get('AUDIT_SPOOL_FSYNC') == '1'
+    # Utilisateur connecté gardé en cache par worker (secondes, 0 = désactivé)
+    USER_CACHE_TTL = 30
+    USER_CACHE_STAMP = os.environ.get('USER_CACHE_STAMP')  # par défaut : instance/users.stamp
+    # Hachage des mots de passe (format werkzeug, ex. 'scrypt:32768:8:1' ou 'pbkdf2:sha256:600000') ;
+    # les anciens hashs sont régénérés à la connexion suivante
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_WORKERS = 2         # vérifications simultanées par worker
+    PASSWORD_QUEUE_LIMIT = 8     # vérifications en attente avant refus immédiat
+    PASSWORD_TIMEOUT = 10        # secondes
+    # Échecs de connexion tolérés sur la fenêtre (par identifiant / par IP, 0 = pas de limite par IP)
+    LOGIN_THROTTLE_WINDOW = 300
+    LOGIN_MAX_ATTEMPTS_USER = 5
+    LOGIN_MAX_ATTEMPTS_IP = int(os.environ.get('LOGIN_MAX_ATTEMPTS_IP', 20))
+    # Derrière un reverse proxy : nombre de proxys de confiance devant gunicorn.
+    # L'IP du client est lue dans X-Forwarded-For (sinon tous les clients
+    # partagent l'adresse du proxy, et la limite par IP les bloque ensemble)
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS', 0))
+    # Sauvegardes (flask backup) : par défaut instance/backups, rotation heures/jours/semaines
+    BACKUP_DIR = os.environ.get('BACKUP_DIR')
+    BACKUP_KEEP_HOURLY = 24
+    BACKUP_KEEP_DAILY = 7
+    BACKUP_KEEP_WEEKLY = 4
+    BACKUP_STEP_PAGES = 256      # pages copiées avant de relâcher le verrou
+    BACKUP_STEP_SLEEP = 0.005    # secondes entre deux paquets
+    LOGIN_THROTTLE_DB_PATH = os.environ.get('LOGIN_THROTTLE_DB_PATH')  # par défaut : instance/login_attempts.db
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -0,0 +1,110 @@
+import random
+import time
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+from app.models import db
+
+# Profil SQLite pour plusieurs workers/threads concurrents :
+# - WAL : les lectures ne bloquent plus l'écriture (et inversement)
+# - synchronous=NORMAL : sûr en WAL, beaucoup moins de fsync
+# - busy_timeout : un écrivain attend le verrou au lieu d'échouer aussitôt
+# - cache_size / mmap_size : pages chaudes gardées en mémoire
+# Appliqué à chaque nouvelle connexion (SQLAlchemy et app.py).
+
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KB = 16000
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+def apply_sqlite_pragmas(conn, busy_timeout=BUSY_TIMEOUT_MS, cache_size=CACHE_SIZE_KB, mmap_size=MMAP_SIZE):
+    """Applique le profil à une connexion sqlite3 brute"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout)}')
+        cursor.execute(f'PRAGMA cache_size=-{int(cache_size)}')
+        cursor.execute(f'PRAGMA mmap_size={int(mmap_size)}')
+    finally:
+        cursor.close()
+
+
+def _is_file_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def configure_engine(app):
+    """Options du moteur (avant db.init_app) : pool de connexions réutilisées par thread"""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if not app.config.get('SQLITE_PROFILE') or not uri or not _is_file_sqlite(uri):
+        return
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('pool_size', app.config.get('SQLITE_POOL_SIZE', 5))
+    options.setdefault('max_overflow', app.config.get('SQLITE_POOL_OVERFLOW', 5))
+    connect_args = options.setdefault('connect_args', {})
+    connect_args.setdefault('timeout', app.config.get('SQLITE_BUSY_TIMEOUT_MS', BUSY_TIMEOUT_MS) / 1000)
+
+
+def init_sqlite(app):
+    """Branche le profil sur chaque connexion ouverte par le moteur (après db.init_app)"""
+    if not app.config.get('SQLITE_PROFILE'):
+        return
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    busy_timeout = app.config.get('SQLITE_BUSY_TIMEOUT_MS', BUSY_TIMEOUT_MS)
+    cache_size = app.config.get('SQLITE_CACHE_SIZE_KB', CACHE_SIZE_KB)
+    mmap_size = app.config.get('SQLITE_MMAP_SIZE', MMAP_SIZE)
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, busy_timeout, cache_size, mmap_size)
+
+
+def pending_columns():
+    """Colonnes du modèle absentes des tables existantes : la base attend une
+    migration (db.create_all ne crée que les tables manquantes)"""
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        present = {column['name'] for column in inspector.get_columns(table.name)}
+        missing += [f'{table.name}.{column.name}' for column in table.columns if column.name not in present]
+    return missing
+
+
+def is_busy_error(error):
+    message = str(getattr(error, 'orig', error)).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def retry_on_busy(f):
+    """Rejoue une écriture refusée car la base est verrouillée (SQLITE_BUSY).
+
+    La transaction est annulée puis la fonction relancée en entier, avec une
+    attente croissante ; rien n'a été écrit puisque le commit a échoué.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        retries = current_app.config.get('SQLITE_WRITE_RETRIES', 3)
+        delay = 0.05
+        for attempt in range(retries + 1):
+            try:
+                return f(*args, **kwargs)
+            except OperationalError as e:
+                if attempt == retries or not is_busy_error(e):
+                    raise
+                db.session.rollback()
+                time.sleep(delay * (1 + random.random()))
+                delay *= 2
+    return decorated_function
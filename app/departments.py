@@ -0,0 +1,85 @@
+from flask import g
+
+from app.models import db, Department
+from app.cache import cached, bump_data_version, DEPARTMENTS
+
+# Dimension « département » : les employés la référencent par clé étrangère.
+#
+# La liste (id, code, libellé) sert aux menus déroulants, aux filtres et aux
+# imports : elle est gardée en cache par processus (voir app/cache.py) sous sa
+# propre version, incrémentée seulement quand un département est créé ou
+# renommé. Les écritures sur les employés (qui mettent à jour effectif et
+# masse salariale dans la même table) ne l'invalident pas. La version n'est
+# relue qu'une fois par requête (ou par contexte d'application, ex. un import).
+
+# Départements créés sur une base neuve (ex-choix codés en dur du formulaire)
+DEFAULT_DEPARTMENTS = [
+    ('IT', 'IT'),
+    ('RH', 'Ressources Humaines'),
+    ('Finance', 'Finance'),
+    ('Marketing', 'Marketing'),
+    ('Commercial', 'Commercial'),
+    ('Direction', 'Direction'),
+]
+
+
+def _load():
+    rows = db.session.query(Department.id, Department.code, Department.libelle).order_by(Department.libelle)
+    return [list(row) for row in rows]
+
+
+def departments():
+    """[(id, code, libellé)] triés par libellé, en cache tant qu'aucun département ne change"""
+    if 'departments' not in g:
+        g.departments = [tuple(row) for row in cached('departments', _load, name=DEPARTMENTS)]
+    return g.departments
+
+
+def department_choices():
+    """Choix du menu déroulant du formulaire employé"""
+    return [('', 'Sélectionner...')] + [(id, libelle) for id, _, libelle in departments()]
+
+
+def department_id(value):
+    """Identifiant d'un département d'après son code ou son libellé (casse ignorée), None sinon"""
+    value = (value or '').strip().lower()
+    if not value:
+        return None
+    for id, code, libelle in departments():
+        if value in (code.lower(), libelle.lower()):
+            return id
+    return None
+
+
+def department_codes():
+    """{id: code}"""
+    return {id: code for id, code, _ in departments()}
+
+
+def create_department(code, libelle=None):
+    """Crée un département (commit inclus) ; invalide la liste en cache"""
+    department = Department(code=code, libelle=libelle or code)
+    db.session.add(department)
+    bump_data_version(DEPARTMENTS)
+    db.session.commit()
+    g.pop('departments', None)
+    return department
+
+
+def rename_department(department, libelle):
+    department.libelle = libelle
+    bump_data_version(DEPARTMENTS)
+    db.session.commit()
+    g.pop('departments', None)
+
+
+def init_departments():
+    """Crée les départements par défaut sur une base neuve"""
+    if db.session.query(Department.id).first() is None:
+        db.session.execute(db.insert(Department), [
+            {'code': code, 'libelle': libelle, 'effectif': 0, 'salaire_total': 0}
+            for code, libelle in DEFAULT_DEPARTMENTS
+        ])
+        bump_data_version(DEPARTMENTS)
+        db.session.commit()
+        g.pop('departments', None)
@@ -0,0 +1,97 @@
+import math
+
+import numpy as np
+
+from app.snapshot import get_snapshot
+
+# Distribution des salaires (percentiles, histogramme, tranches), globale et
+# par département, calculée en NumPy sur l'instantané en mémoire (voir
+# app/snapshot.py) : un seul tri vectorisé, pas d'ORDER BY / OFFSET par
+# statistique. Résultats exacts (interpolation linéaire, comme PERCENTILE.INC
+# d'Excel).
+
+PERCENTILES = [10, 25, 50, 75, 90]
+HISTOGRAM_BINS = 20
+# Bornes des tranches de salaire mensuel (€)
+PAY_BANDS = [2000, 3000, 4000, 5000, 7000]
+
+
+def band_labels(edges=PAY_BANDS):
+    labels = [f"< {edges[0]} €"]
+    labels += [f"{low} – {high} €" for low, high in zip(edges, edges[1:])]
+    labels.append(f"≥ {edges[-1]} €")
+    return labels
+
+
+def percentiles(values, ps=PERCENTILES):
+    """{'p10': ..., 'p50': ...} ; None pour un ensemble vide"""
+    if len(values) == 0:
+        return {f'p{p}': None for p in ps}
+    return {f'p{p}': round(float(v), 2) for p, v in zip(ps, np.percentile(values, ps))}
+
+
+def _nice_step(raw):
+    """Pas « rond » (1, 2, 2.5 ou 5 × 10^k) au moins égal à raw"""
+    if raw <= 0:
+        return 1
+    power = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 2.5, 5, 10):
+        if factor * power >= raw:
+            return factor * power
+
+
+def histogram(values, bins=HISTOGRAM_BINS):
+    """[{'min', 'max', 'count'}] sur des classes de largeur ronde"""
+    if len(values) == 0:
+        return []
+    low, high = float(values.min()), float(values.max())
+    step = _nice_step((high - low) / bins)
+    start = math.floor(low / step) * step
+    # Assez de classes pour que le maximum tombe dans la dernière
+    count = math.floor((high - start) / step) + 1
+    edges = start + step * np.arange(count + 1)
+    counts, _ = np.histogram(values, edges)
+    return [{'min': float(a), 'max': float(b), 'count': int(c)}
+            for a, b, c in zip(edges[:-1], edges[1:], counts)]
+
+
+def salary_distribution():
+    """Statistiques de distribution sérialisables (mises en cache par la route)"""
+    snapshot = get_snapshot()
+    codes, salaires, names = snapshot.departement, snapshot.salaire, snapshot.departement_labels
+    edges = np.asarray(PAY_BANDS, dtype=np.float64)
+    bands = np.searchsorted(edges, salaires, side='right')
+    nbands = len(PAY_BANDS) + 1
+
+    # Un seul tri (département, salaire) : chaque département devient une tranche contiguë
+    order = np.lexsort((salaires, codes))
+    codes_sorted = codes[order]
+    salaires_sorted = salaires[order]
+    bounds = np.flatnonzero(np.diff(codes_sorted)) + 1
+    starts = np.concatenate(([0], bounds)) if len(order) else np.array([], dtype=np.int64)
+    ends = np.concatenate((bounds, [len(order)])) if len(order) else np.array([], dtype=np.int64)
+
+    band_counts = np.bincount(codes * nbands + bands, minlength=len(names) * nbands).reshape(len(names), nbands)
+
+    departements = []
+    for start, end in zip(starts, ends):
+        code = codes_sorted[start]
+        values = salaires_sorted[start:end]
+        departements.append({
+            'departement': names[code],
+            'count': int(end - start),
+            'percentiles': percentiles(values),
+            'bands': band_counts[code].tolist(),
+        })
+    departements.sort(key=lambda d: -d['count'])
+
+    total_bands = band_counts.sum(axis=0).tolist() if len(names) else [0] * nbands
+    total = len(salaires)
+    return {
+        'count': total,
+        'percentiles': percentiles(salaires),
+        'histogram': histogram(salaires),
+        'band_labels': band_labels(),
+        'bands': [{'count': c, 'share': round(100 * c / total, 1) if total else 0} for c in total_bands],
+        'departements': departements,
+    }
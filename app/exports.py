@@ -0,0 +1,211 @@
+from io import StringIO
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+import csv
+import json
+
+from openpyxl import Workbook
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optionnel : exports Parquet / Arrow indisponibles
+    pa = pq = None
+
+from app.models import db, Employee, Department
+
+# Taille des lots lus en base pendant un export
+EXPORT_CHUNK_SIZE = 1000
+
+# Au-delà de cette taille, le classeur XLSX est déversé sur disque
+XLSX_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+FILE_CHUNK_SIZE = 64 * 1024
+# Lignes par lot colonne (Parquet : un groupe de lignes par lot)
+COLUMNAR_BATCH_SIZE = 64 * 1024
+
+CSV_HEADER = ['ID', 'Nom', 'Prénom', 'Email', 'Téléphone', 'Poste', 'Salaire (€)', 'Date Embauche', 'Département']
+XLSX_HEADER = ['ID', 'Nom', 'Prénom', 'Email', 'Téléphone', 'Poste', 'Salaire', 'Date Embauche', 'Département']
+
+# Colonnes lues pour l'export (tuples, pas d'objets ORM) ; département par son code
+EXPORT_COLUMNS = (
+    Employee.id, Employee.nom, Employee.prenom, Employee.email,
+    Employee.telephone, Employee.poste, Employee.salaire,
+    Employee.date_embauche, Department.code.label('departement')
+)
+# Noms des colonnes dans les formats typés (NDJSON, Parquet, Arrow)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+# Encodeur réutilisé (json.dumps avec options en recrée un à chaque appel)
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def iter_employee_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    """Parcourt les employés triés par nom, par lots, sous forme de tuples"""
+    stmt = (db.select(*EXPORT_COLUMNS)
+            .outerjoin(Department, Employee.departement_id == Department.id)
+            .order_by(Employee.nom, Employee.id))
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    try:
+        for row in result:
+            yield tuple(row)
+    finally:
+        result.close()
+
+
+def format_csv_row(row):
+    """Met en forme une ligne (id, nom, prenom, email, telephone, poste, salaire, date, departement)"""
+    emp_id, nom, prenom, email, telephone, poste, salaire, date_embauche, departement = row
+    if date_embauche and hasattr(date_embauche, 'strftime'):
+        date_embauche = date_embauche.strftime('%Y-%m-%d')
+    return [
+        emp_id, nom, prenom, email,
+        telephone or '', poste, f"{salaire:.2f}" if salaire is not None else '',
+        date_embauche or '', departement or ''
+    ]
+
+
+def stream_csv(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Génère le CSV morceau par morceau : la mémoire reste constante"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    # Premier octet envoyé immédiatement (en-tête)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    count = 0
+    for row in rows:
+        writer.writerow(format_csv_row(row))
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def format_xlsx_row(row):
+    """Met en forme une ligne pour Excel (salaire et date restent typés)"""
+    emp_id, nom, prenom, email, telephone, poste, salaire, date_embauche, departement = row
+    return [
+        emp_id, nom, prenom, email,
+        telephone or '', poste, salaire,
+        date_embauche, departement or ''
+    ]
+
+
+def build_xlsx(rows, fileobj):
+    """Écrit les lignes dans un classeur en mode write-only (ligne par ligne, sans pandas)"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Employés')
+    sheet.append(XLSX_HEADER)
+    for row in rows:
+        sheet.append(format_xlsx_row(row))
+    workbook.save(fileobj)
+    return fileobj
+
+
+def stream_ndjson(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Un objet JSON par ligne (salaire nombre, date ISO), par morceaux"""
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_FIELDS, row))
+        if record['date_embauche'] is not None:
+            record['date_embauche'] = record['date_embauche'].isoformat()
+        lines.append(_json_encoder.encode(record))
+        if len(lines) == chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def columnar_available():
+    return pa is not None
+
+
+def arrow_schema():
+    # Département et poste encodés en dictionnaire (peu de valeurs distinctes)
+    categorie = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('id', pa.int64()), ('nom', pa.string()), ('prenom', pa.string()),
+        ('email', pa.string()), ('telephone', pa.string()), ('poste', categorie),
+        ('salaire', pa.float64()), ('date_embauche', pa.date32()), ('departement', categorie),
+    ])
+
+
+def _dictionary_array(values, index, labels):
+    """Codes dans un dictionnaire cumulé d'un lot à l'autre : chaque lot ne fait
+    qu'étendre le précédent (deltas Arrow)"""
+    codes = []
+    for value in values:
+        if value is None:
+            codes.append(None)
+            continue
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(labels)
+            labels.append(value)
+        codes.append(code)
+    return pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), pa.array(labels, pa.string()))
+
+
+def iter_record_batches(rows, batch_size=COLUMNAR_BATCH_SIZE):
+    """Regroupe les lignes du curseur en lots Arrow typés"""
+    schema = arrow_schema()
+    dictionaries = {'poste': ({}, []), 'departement': ({}, [])}
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        arrays = []
+        for field, values in zip(schema, zip(*batch)):
+            if field.name in dictionaries:
+                arrays.append(_dictionary_array(values, *dictionaries[field.name]))
+            else:
+                arrays.append(pa.array(values, field.type))
+        yield pa.record_batch(arrays, schema=schema)
+
+
+def build_parquet(rows, fileobj, compression='zstd'):
+    """Écrit un fichier Parquet lot par lot (mémoire bornée à un lot)"""
+    with pq.ParquetWriter(fileobj, arrow_schema(), compression=compression) as writer:
+        for batch in iter_record_batches(rows):
+            writer.write_batch(batch)
+    return fileobj
+
+
+def build_arrow(rows, fileobj, compression='zstd'):
+    """Écrit un fichier Arrow IPC lot par lot"""
+    options = pa.ipc.IpcWriteOptions(compression=compression, emit_dictionary_deltas=True)
+    with pa.ipc.new_file(fileobj, arrow_schema(), options=options) as writer:
+        for batch in iter_record_batches(rows):
+            writer.write_batch(batch)
+    return fileobj
+
+
+def spool_xlsx(rows):
+    """Construit le classeur dans un fichier temporaire (mémoire bornée)"""
+    fileobj = SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_SIZE)
+    try:
+        build_xlsx(rows, fileobj)
+    except Exception:
+        fileobj.close()
+        raise
+    fileobj.seek(0)
+    return fileobj
+
+
+def stream_file(fileobj, chunk_size=FILE_CHUNK_SIZE):
+    """Renvoie le contenu d'un fichier par blocs puis le ferme"""
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
@@ -3,6 +3,8 @@ from wtforms import StringField, PasswordField, FloatField, DateField, SelectFie
 from wtforms.validators import DataRequired, Email, Length, NumberRange, ValidationError, Optional
 import re
 
+from app.departments import department_choices
+
 class LoginForm(FlaskForm):
     username = StringField('Nom d\'utilisateur', validators=[
         DataRequired(message="Le nom d'utilisateur est requis"),
@@ -13,6 +15,10 @@ class LoginForm(FlaskForm):
     ])
     submit = SubmitField('Se connecter')
 
+def optional_int(value):
+    """'' (aucun choix) -> None"""
+    return int(value) if value not in (None, '') else None
+
 class EmployeeForm(FlaskForm):
     nom = StringField('Nom', validators=[
         DataRequired(message="Le nom est requis"),
@@ -27,15 +33,8 @@ class EmployeeForm(FlaskForm):
         Email(message="Email invalide")
     ])
     telephone = StringField('Téléphone', validators=[Optional(), Length(max=20)])
-    departement = SelectField('Département', choices=[
-        ('', 'Sélectionner...'),
-        ('IT', 'IT'),
-        ('RH', 'Ressources Humaines'),
-        ('Finance', 'Finance'),
-        ('Marketing', 'Marketing'),
-        ('Commercial', 'Commercial'),
-        ('Direction', 'Direction')
-    ])
+    # Choix lus dans la table departments (en cache, voir app/departments.py)
+    departement_id = SelectField('Département', coerce=optional_int)
     poste = StringField('Poste', validators=[
         DataRequired(message="Le poste est requis"),
         Length(min=2, max=100)
@@ -49,6 +48,10 @@ class EmployeeForm(FlaskForm):
     ])
     submit = SubmitField('Enregistrer')
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.departement_id.choices = department_choices()
+    
     def validate_telephone(self, field):
         if field.data:
             # Accepte les formats: 0123456789, 01 23 45 67 89, +33 1 23 45 67 89
@@ -56,6 +59,12 @@ class EmployeeForm(FlaskForm):
             if not re.match(pattern, field.data):
                 raise ValidationError("Format de téléphone invalide")
 
+ROLES = [
+    ('readonly', 'Lecture seule'),
+    ('rh', 'RH'),
+    ('admin', 'Administrateur')
+]
+
 class UserForm(FlaskForm):
     username = StringField('Nom d\'utilisateur', validators=[
         DataRequired(),
@@ -69,9 +78,5 @@ class UserForm(FlaskForm):
         DataRequired(),
         Length(min=8, message="Le mot de passe doit contenir au moins 8 caractères")
     ])
-    role = SelectField('Rôle', choices=[
-        ('readonly', 'Lecture seule'),
-        ('rh', 'RH'),
-        ('admin', 'Administrateur')
-    ])
+    role = SelectField('Rôle', choices=ROLES)
     submit = SubmitField('Créer')
\ No newline at end of file
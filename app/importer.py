@@ -0,0 +1,203 @@
+from io import TextIOWrapper
+import csv
+import json
+import unicodedata
+import re
+
+from openpyxl import load_workbook
+from werkzeug.datastructures import MultiDict
+
+from app.models import db, Employee, EmployeeHistory
+from app.forms import EmployeeForm
+from app import aggregates
+from app.cache import bump_data_version
+from app.departments import department_id
+from app.database import retry_on_busy
+
+# Nombre de lignes insérées par transaction
+IMPORT_BATCH_SIZE = 1000
+
+FIELDS = ['nom', 'prenom', 'email', 'telephone', 'departement_id', 'poste', 'salaire', 'date_embauche']
+
+# En-têtes acceptés (normalisés : minuscules, sans accents ni ponctuation)
+HEADER_ALIASES = {
+    'nom': 'nom',
+    'prenom': 'prenom',
+    'email': 'email',
+    'mail': 'email',
+    'telephone': 'telephone',
+    'tel': 'telephone',
+    'departement': 'departement',
+    'poste': 'poste',
+    'salaire': 'salaire',
+    'dateembauche': 'date_embauche',
+    'datedembauche': 'date_embauche',
+}
+
+
+class ImportFileError(Exception):
+    pass
+
+
+class ImportReport:
+    """Résultat d'un import : lignes insérées et erreurs par ligne"""
+
+    def __init__(self):
+        self.total = 0
+        self.inserted = 0
+        self.errors = []  # (numéro de ligne, [messages])
+
+    def add_error(self, line, messages):
+        self.errors.append((line, messages))
+
+
+def normalize_header(value):
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    value = ''.join(c for c in value if not unicodedata.combining(c)).lower()
+    return re.sub(r'[^a-z0-9]', '', value)
+
+
+def read_csv(stream):
+    """Lit un CSV (UTF-8, séparateur ',' ou ';') ligne par ligne"""
+    text = TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.reader(text, dialect)
+
+
+def read_xlsx(stream):
+    """Lit la première feuille d'un classeur en mode read-only (ligne par ligne)"""
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(stream, filename):
+    filename = (filename or '').lower()
+    if filename.endswith('.xlsx'):
+        return read_xlsx(stream)
+    if filename.endswith('.csv'):
+        return read_csv(stream)
+    raise ImportFileError("Format non supporté (CSV ou XLSX attendu)")
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def iter_records(rows):
+    """Associe chaque ligne aux champs de l'employé d'après la ligne d'en-tête"""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFileError("Fichier vide")
+
+    columns = [HEADER_ALIASES.get(normalize_header(h)) for h in header]
+    missing = {'nom', 'prenom', 'email', 'poste', 'salaire', 'date_embauche'} - set(columns)
+    if missing:
+        raise ImportFileError(f"Colonnes manquantes : {', '.join(sorted(missing))}")
+
+    for line, row in enumerate(rows, start=2):
+        if not any(_cell(v) for v in row):
+            continue
+        yield line, {field: _cell(value) for field, value in zip(columns, row) if field}
+
+
+def validate_record(record):
+    """Valide une ligne avec les règles du formulaire EmployeeForm"""
+    # Département donné par son code ou son libellé dans le fichier
+    departement = record.pop('departement', '')
+    dept_id = department_id(departement)
+    if departement and dept_id is None:
+        return None, [f"Département: Département inconnu ({departement})"]
+    record['departement_id'] = '' if dept_id is None else str(dept_id)
+    form = EmployeeForm(formdata=MultiDict(record), meta={'csrf': False})
+    if not form.validate():
+        errors = [f"{form[name].label.text}: {message}"
+                  for name, messages in form.errors.items() for message in messages]
+        return None, errors
+    return {field: form[field].data for field in FIELDS}, None
+
+
+@retry_on_busy
+def _write_batch(rows, user_id):
+    """Insertions groupées d'un lot (employés, historique, agrégats) en une transaction"""
+    ids = db.session.scalars(
+        db.insert(Employee).returning(Employee.id, sort_by_parameter_order=True), rows
+    ).all()
+    db.session.execute(db.insert(EmployeeHistory), [{
+        'employee_id': employee_id,
+        'user_id': user_id,
+        'action': 'create',
+        'changes': json.dumps({'nom': values['nom'], 'prenom': values['prenom'], 'email': values['email']})
+    } for employee_id, values in zip(ids, rows)])
+
+    aggregates.record_bulk_insert(rows)
+    bump_data_version()
+    db.session.commit()
+
+
+def _insert_batch(batch, user_id, report):
+    """Insère un lot : doublons détectés en une requête, puis insertions groupées"""
+    emails = [values['email'] for _, values in batch]
+    existing = set(db.session.scalars(db.select(Employee.email).where(Employee.email.in_(emails))))
+
+    rows = []
+    for line, values in batch:
+        if values['email'] in existing:
+            report.add_error(line, ["Email: Cet email est déjà utilisé"])
+        else:
+            rows.append(values)
+    if not rows:
+        return
+
+    try:
+        _write_batch(rows, user_id)
+    except db.exc.IntegrityError:
+        # Email inséré entre-temps par un autre utilisateur : le lot entier est annulé
+        db.session.rollback()
+        for line, values in batch:
+            if values['email'] not in existing:
+                report.add_error(line, ["Lot annulé : conflit d'email pendant l'import, réessayer"])
+        return
+    report.inserted += len(rows)
+
+
+def import_employees(rows, user_id, batch_size=IMPORT_BATCH_SIZE):
+    """Importe des employés depuis des lignes brutes (en-tête en première ligne)"""
+    report = ImportReport()
+    seen = set()
+    batch = []
+
+    for line, record in iter_records(rows):
+        report.total += 1
+        values, errors = validate_record(record)
+        if errors:
+            report.add_error(line, errors)
+            continue
+        if values['email'] in seen:
+            report.add_error(line, ["Email: Email en double dans le fichier"])
+            continue
+        seen.add(values['email'])
+        batch.append((line, values))
+
+        if len(batch) >= batch_size:
+            _insert_batch(batch, user_id, report)
+            batch = []
+
+    if batch:
+        _insert_batch(batch, user_id, report)
+    report.errors.sort()
+    return report
@@ -0,0 +1,136 @@
+import json
+import logging
+import time
+from collections import Counter
+
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+
+from app.models import db
+
+# Instrumentation par requête (optionnelle, INSTRUMENTATION=1) :
+# - nombre et durée cumulée des requêtes SQL (événements du moteur SQLAlchemy)
+# - durée du rendu des templates, mesurée à part
+# - en-tête Server-Timing (visible dans l'onglet Réseau du navigateur)
+# - une ligne de log JSON par requête
+# - alerte N+1 : une même requête SQL répétée plus de N fois dans une page
+#   (ex. h.user chargé une fois par ligne dans historique.html)
+
+
+def _perf():
+    if not has_request_context():
+        return None
+    return g.get('perf')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _perf() is not None:
+        conn.info.setdefault('perf_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    perf = _perf()
+    started = conn.info.get('perf_started')
+    if perf is None or not started:
+        return
+    perf['sql_time'] += time.perf_counter() - started.pop()
+    perf['sql_count'] += 1
+    # Les paramètres sont liés (?), le texte est identique d'une ligne à l'autre
+    perf['statements'][statement] += 1
+
+
+def _before_render(app, template, context, **extra):
+    perf = _perf()
+    if perf is not None:
+        perf['render_started'].append(time.perf_counter())
+
+
+def _after_render(app, template, context, **extra):
+    perf = _perf()
+    if perf is not None and perf['render_started']:
+        perf['render_time'] += time.perf_counter() - perf['render_started'].pop()
+
+
+def suspected_n_plus_one(perf, threshold):
+    """Requêtes répétées au moins `threshold` fois : [(nombre, requête)]"""
+    return [(count, statement) for statement, count in perf['statements'].most_common()
+            if count >= threshold]
+
+
+def server_timing(perf, total):
+    # Valeur d'en-tête HTTP : ASCII uniquement (latin-1 au mieux côté WSGI)
+    metrics = [
+        f'db;dur={perf["sql_time"] * 1000:.1f};desc="{perf["sql_count"]} requetes SQL"',
+        f'render;dur={perf["render_time"] * 1000:.1f}',
+    ]
+    # Corps déjà compressé (hors flux, dont la compression suit l'envoi)
+    compress = perf.get('compress')
+    if compress:
+        metrics.append(f'compress;dur={compress["time"] * 1000:.1f}')
+    metrics.append(f'app;dur={total * 1000:.1f}')
+    return ', '.join(metrics)
+
+
+def init_instrumentation(app):
+    """Branche l'instrumentation si INSTRUMENTATION_ENABLED est activé"""
+    if not app.config.get('INSTRUMENTATION_ENABLED'):
+        return
+
+    threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 10)
+    if app.logger.level == logging.NOTSET:
+        app.logger.setLevel(logging.INFO)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_timer():
+        g.perf = {
+            'started': time.perf_counter(),
+            'sql_count': 0,
+            'sql_time': 0.0,
+            'render_time': 0.0,
+            'render_started': [],
+            'statements': Counter(),
+        }
+
+    @app.after_request
+    def add_server_timing(response):
+        perf = g.get('perf')
+        if perf is None:
+            return response
+        total = time.perf_counter() - perf['started']
+        response.headers['Server-Timing'] = server_timing(perf, total)
+
+        endpoint = request.endpoint
+        method = request.method
+        path = request.full_path.rstrip('?')
+
+        def log_request():
+            # Appelé à la fermeture de la réponse : inclut le corps des exports en streaming
+            duration = time.perf_counter() - perf['started']
+            repeated = suspected_n_plus_one(perf, threshold)
+            app.logger.info(json.dumps({
+                'event': 'request',
+                'method': method,
+                'path': path,
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+                'sql_count': perf['sql_count'],
+                'sql_ms': round(perf['sql_time'] * 1000, 2),
+                'render_ms': round(perf['render_time'] * 1000, 2),
+                'n_plus_one': len(repeated),
+                'compress_ms': round(perf['compress']['time'] * 1000, 2) if 'compress' in perf else None,
+                'bytes_out': perf['compress']['bytes_out'] if 'compress' in perf else None,
+            }, ensure_ascii=False))
+            for count, statement in repeated:
+                app.logger.warning("⚠️ N+1 probable sur %s : requête exécutée %d fois : %s",
+                                   endpoint, count, ' '.join(statement.split())[:300])
+
+        response.call_on_close(log_request)
+        return response
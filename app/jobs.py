@@ -0,0 +1,200 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app.models import db
+from app.exports import iter_employee_rows
+from app.artifacts import export_version, artifact_path, write_artifact, finalize_artifact
+from app import aggregates
+
+# Exports en arrière-plan : la requête crée une tâche, un pool de threads du
+# worker construit le fichier, la page de suivi interroge l'avancement puis
+# propose le téléchargement. Aucun service externe : l'état des tâches est
+# dans un petit fichier SQLite local (par défaut instance/export_jobs.db),
+# lisible par tous les workers gunicorn.
+#
+# Une tâche est identifiée par (format, époque de la base, version des données) : deux demandes
+# du même export sur les mêmes données partagent la même tâche. Le fichier est
+# écrit dans le cache des exports (voir app/artifacts.py), partagé avec les
+# téléchargements directs.
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+# Lignes écrites entre deux mises à jour de l'avancement
+PROGRESS_EVERY = 5000
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _path(app):
+    return app.config.get('EXPORT_JOBS_DB_PATH') or os.path.join(app.instance_path, 'export_jobs.db')
+
+
+def _connection(app):
+    path = _path(app)
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'path', None) != path:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                format TEXT NOT NULL,
+                epoch INTEGER,
+                version INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                total INTEGER,
+                path TEXT,
+                error TEXT,
+                pid INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        # Fichier créé avant l'ajout de l'époque
+        if 'epoch' not in {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}:
+            conn.execute('ALTER TABLE jobs ADD COLUMN epoch INTEGER')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_jobs_format_version ON jobs (format, version)')
+        _local.conn = conn
+        _local.path = path
+    return conn
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _usable(job):
+    """Tâche réutilisable : terminée (fichier présent) ou en cours dans un processus vivant"""
+    if job['status'] == DONE:
+        return job['path'] is not None and os.path.exists(job['path'])
+    return job['status'] in (PENDING, RUNNING) and _pid_alive(job['pid'])
+
+
+def _update(app, job_id, **values):
+    values['updated_at'] = time.time()
+    columns = ', '.join(f'{name} = ?' for name in values)
+    _connection(app).execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*values.values(), job_id))
+
+
+def get_job(job_id, app=None):
+    app = app or current_app
+    row = _connection(app).execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return dict(row) if row is not None else None
+
+
+def purge_jobs(app, max_age):
+    """Oublie les tâches plus anciennes que max_age secondes (les fichiers relèvent
+    de l'éviction du cache des exports)"""
+    conn = _connection(app)
+    old = conn.execute('SELECT id, path, status, pid FROM jobs WHERE updated_at < ?',
+                       (time.time() - max_age,)).fetchall()
+    old = [job for job in old if job['status'] != RUNNING or not _pid_alive(job['pid'])]
+    for job in old:
+        conn.execute('DELETE FROM jobs WHERE id = ?', (job['id'],))
+    return len(old)
+
+
+def start_export(export_format):
+    """Renvoie (tâche, créée) : la tâche en cours ou terminée pour ces données, sinon une nouvelle"""
+    app = current_app._get_current_object()
+    epoch, version = export_version()
+    purge_jobs(app, app.config.get('EXPORT_JOB_TTL', 3600))
+
+    conn = _connection(app)
+    # Verrou d'écriture : deux workers ne créent pas la même tâche en même temps
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        jobs = conn.execute('SELECT * FROM jobs WHERE format = ? AND version = ? AND epoch = ? AND status != ? '
+                            'ORDER BY created_at DESC', (export_format, version, epoch, FAILED)).fetchall()
+        for job in jobs:
+            if _usable(job):
+                conn.execute('COMMIT')
+                return dict(job), False
+            if job['status'] != DONE:
+                # Worker arrêté pendant la construction
+                conn.execute('UPDATE jobs SET status = ?, error = ? WHERE id = ?',
+                             (FAILED, 'Processus arrêté', job['id']))
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        conn.execute('INSERT INTO jobs (id, format, epoch, version, status, pid, created_at, updated_at) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                     (job_id, export_format, epoch, version, PENDING, os.getpid(), now, now))
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+    get_executor(app).submit(run_job, app, job_id)
+    return get_job(job_id, app), True
+
+
+def get_executor(app):
+    """Pool de threads du processus (recréé après un fork)"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=app.config.get('EXPORT_JOB_WORKERS', 1),
+                                           thread_name_prefix='export')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _track(app, job_id, rows):
+    """Compte les lignes écrites et publie l'avancement par paliers"""
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % PROGRESS_EVERY == 0:
+            _update(app, job_id, done=count)
+    _update(app, job_id, done=count)
+
+
+def run_job(app, job_id):
+    job = get_job(job_id, app)
+    with app.app_context():
+        try:
+            # Version relue dans la transaction de l'export : clé exacte du fichier produit
+            epoch, version = export_version()
+            path = artifact_path(job['format'], epoch, version, app)
+            if os.path.exists(path):
+                _update(app, job_id, status=DONE, path=path, epoch=epoch, version=version)
+                return
+            _update(app, job_id, status=RUNNING, total=aggregates.global_stats()[0])
+            path = write_artifact(job['format'], epoch, version, _track(app, job_id, iter_employee_rows()), app)
+            _update(app, job_id, status=DONE, path=path, epoch=epoch, version=version)
+            finalize_artifact(app, path)
+        except Exception as e:
+            logger.exception("Export %s en échec", job_id)
+            _update(app, job_id, status=FAILED, error=str(e))
+        finally:
+            db.session.remove()
+
+
+def job_progress(job):
+    """Pourcentage d'avancement (None si le total n'est pas encore connu)"""
+    if job['status'] == DONE:
+        return 100
+    if not job['total']:
+        return None
+    return min(99, int(100 * job['done'] / job['total']))
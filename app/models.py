@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask import current_app, has_app_context
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
@@ -17,7 +18,9 @@ class User(UserMixin, db.Model):
     is_active = db.Column(db.Boolean, default=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # Paramètres de hachage configurables (PASSWORD_HASH_METHOD)
+        method = current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt') if has_app_context() else 'scrypt'
+        self.password_hash = generate_password_hash(password, method=method)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -28,26 +31,62 @@ class User(UserMixin, db.Model):
     def can_edit(self):
         return self.role in ['admin', 'rh']
 
+class Department(db.Model):
+    __tablename__ = 'departments'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(100), unique=True, nullable=False)  # ex. 'RH' (filtres, imports)
+    libelle = db.Column(db.String(100), nullable=False)  # ex. 'Ressources Humaines'
+    # Agrégats maintenus à chaque écriture (voir app/aggregates.py)
+    effectif = db.Column(db.Integer, nullable=False, default=0)
+    salaire_total = db.Column(db.Float, nullable=False, default=0)
+
 class Employee(db.Model):
     __tablename__ = 'employees'
+    __table_args__ = (
+        # Liste triée par (nom, id) et pagination par clé
+        db.Index('ix_employees_nom_id', 'nom', 'id'),
+        # Filtre département + même tri
+        db.Index('ix_employees_departement_id_nom_id', 'departement_id', 'nom', 'id'),
+        # Filtre salaire >= x et top salaires (ORDER BY salaire DESC LIMIT 5)
+        db.Index('ix_employees_salaire', 'salaire'),
+        # Regroupement par année d'embauche (couvrant : pas d'accès à la table)
+        db.Index('ix_employees_date_embauche_salaire', 'date_embauche', 'salaire'),
+        # Lignes modifiées depuis le dernier rafraîchissement de l'instantané (app/snapshot.py)
+        db.Index('ix_employees_updated_at', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nom = db.Column(db.String(100), nullable=False)
     prenom = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     telephone = db.Column(db.String(20))
-    departement = db.Column(db.String(100))
+    departement_id = db.Column(db.Integer,
+                               db.ForeignKey('departments.id', name='fk_employees_departement_id'))
     poste = db.Column(db.String(100))
     salaire = db.Column(db.Float, nullable=False)
     date_embauche = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Historique des modifications
-    modifications = db.relationship('EmployeeHistory', backref='employee', lazy='dynamic')
+    # Chargé avec l'employé (jointure sur une petite table)
+    department = db.relationship('Department', lazy='joined')
+    
+    # Historique des modifications (conservé après suppression de l'employé)
+    modifications = db.relationship('EmployeeHistory', backref='employee', lazy='dynamic',
+                                    passive_deletes='all')
+    
+    @property
+    def departement(self):
+        """Code du département (affichage, exports)"""
+        return self.department.code if self.department is not None else None
 
 class EmployeeHistory(db.Model):
     __tablename__ = 'employee_history'
+    __table_args__ = (
+        # Historique d'un employé, du plus récent au plus ancien
+        db.Index('ix_employee_history_employee_timestamp', 'employee_id', 'timestamp', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -56,4 +95,25 @@ class EmployeeHistory(db.Model):
     changes = db.Column(db.Text)  # JSON des changements
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     
-    user = db.relationship('User', backref='actions')
\ No newline at end of file
+    user = db.relationship('User', backref='actions')
+
+# Agrégats maintenus à chaque écriture (voir app/aggregates.py)
+class StatsGlobal(db.Model):
+    __tablename__ = 'stats_global'
+    
+    id = db.Column(db.Integer, primary_key=True)  # une seule ligne (id = 1)
+    effectif = db.Column(db.Integer, nullable=False, default=0)
+    salaire_total = db.Column(db.Float, nullable=False, default=0)
+
+class StatsAnnee(db.Model):
+    __tablename__ = 'stats_annee'
+    
+    annee = db.Column(db.String(4), primary_key=True)  # '' si date inconnue
+    embauches = db.Column(db.Integer, nullable=False, default=0)
+    salaire_total = db.Column(db.Float, nullable=False, default=0)
+
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)  # ex. 'employees'
+    version = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,137 @@
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import date, datetime
+import json
+
+from app.models import db
+
+
+def encode_cursor(values):
+    """Transforme les valeurs de tri d'une ligne en jeton opaque pour l'URL"""
+    values = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Décode un jeton ; renvoie None s'il est invalide (on repart de la première page)"""
+    if not token:
+        return None
+    try:
+        raw = urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+# Types JSON acceptés dans un jeton selon le type Python de la colonne
+ACCEPTED_TYPES = {str: (str,), int: (int,), float: (int, float)}
+
+
+def _python_type(column):
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None  # expression sans type (ex. rang de pertinence)
+
+
+def _valid(value, python_type):
+    if isinstance(value, bool):
+        return False
+    if python_type in (date, datetime):
+        if not isinstance(value, str):
+            return False
+        try:
+            python_type.fromisoformat(value)
+        except ValueError:
+            return False
+        return True
+    return isinstance(value, ACCEPTED_TYPES.get(python_type, (str, int, float)))
+
+
+def _bound_row(columns, values):
+    """Reconstruit un tuple SQL typé à partir des valeurs d'un jeton ; None si une
+    valeur ne correspond pas au type de sa colonne (jeton altéré)"""
+    types = [_python_type(column) for column in columns]
+    if not all(_valid(value, python_type) for value, python_type in zip(values, types)):
+        return None
+    key_column, key_value = columns[-1], values[-1]
+    bound = []
+    for column, value, python_type in zip(columns, values, types):
+        if python_type in (date, datetime):
+            value = python_type.fromisoformat(value)
+        literal = db.literal(value, column.type)
+        if python_type is datetime and getattr(column, 'table', None) is getattr(key_column, 'table', False):
+            # Horodatage comparé au texte stocké sur la ligne repère : '… 09:00:00' et
+            # '… 09:00:00.000000' ne sont pas égaux pour SQLite (pages qui se
+            # chevauchent) ; valeur du jeton si la ligne a été supprimée depuis
+            stored = db.select(column).where(key_column == key_value).correlate(None).scalar_subquery()
+            literal = db.func.coalesce(stored, literal)
+        bound.append(literal)
+    return db.tuple_(*bound)
+
+
+class KeysetPage:
+    """Une page obtenue par pagination « seek » (sans OFFSET ni COUNT)"""
+
+    def __init__(self, items, has_next, has_prev, next_cursor, prev_cursor, total=None):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+
+def keyset_paginate(query, columns, per_page, after=None, before=None, descending=False,
+                    key=None, total=None):
+    """Pagine `query` sur le tuple `columns` (le dernier doit être unique, ex. l'id).
+
+    `after` / `before` sont des jetons produits par encode_cursor. Le coût d'une
+    page ne dépend pas de sa position : la base se place directement sur la clé.
+    `key` extrait les valeurs de tri d'un élément (par défaut, les attributs
+    portant le nom des colonnes).
+    """
+    if key is None:
+        names = [c.key for c in columns]
+        key = lambda item: [getattr(item, name) for name in names]
+
+    after_values = decode_cursor(after, len(columns))
+    before_values = None if after_values else decode_cursor(before, len(columns))
+    values = after_values or before_values
+    # Jeton absent, invalide ou altéré (types incohérents) : première page
+    bound = _bound_row(columns, values) if values else None
+    row = db.tuple_(*columns)
+    # En remontant (before), on lit dans l'ordre inverse puis on retourne la page
+    backwards = bound is not None and before_values is not None
+    forwards = bound is not None and after_values is not None
+
+    if forwards:
+        query = query.filter(row < bound if descending else row > bound)
+    elif backwards:
+        query = query.filter(row > bound if descending else row < bound)
+
+    if descending != backwards:
+        query = query.order_by(*[c.desc() for c in columns])
+    else:
+        query = query.order_by(*[c.asc() for c in columns])
+
+    items = query.limit(per_page + 1).all()
+    more = len(items) > per_page
+    items = items[:per_page]
+    if backwards:
+        items.reverse()
+
+    has_next = more if not backwards else True
+    has_prev = more if backwards else forwards
+
+    return KeysetPage(
+        items,
+        has_next=has_next and bool(items),
+        has_prev=has_prev and bool(items),
+        next_cursor=encode_cursor(key(items[-1])) if items else None,
+        prev_cursor=encode_cursor(key(items[0])) if items else None,
+        total=total,
+    )
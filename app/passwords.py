@@ -0,0 +1,80 @@
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Vérification des mots de passe dans un pool borné : le hachage est
+# volontairement coûteux, une rafale de connexions ne doit pas occuper tous
+# les threads gunicorn. Au-delà de PASSWORD_WORKERS vérifications en cours et
+# PASSWORD_QUEUE_LIMIT en attente, la demande est refusée tout de suite.
+
+_lock = threading.Lock()
+_pool = {'pid': None, 'executor': None, 'slots': None}
+
+
+class PasswordBusy(Exception):
+    pass
+
+
+def hash_method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=hash_method())
+
+
+@functools.lru_cache(maxsize=8)
+def _method_prefix(method):
+    # Forme complète des paramètres (ex. 'scrypt' -> 'scrypt:32768:8:1')
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+@functools.lru_cache(maxsize=8)
+def _dummy_hash(method):
+    return generate_password_hash(os.urandom(16).hex(), method=method)
+
+
+def needs_rehash(password_hash):
+    """Vrai si le hash a été produit avec d'autres paramètres que ceux configurés"""
+    return password_hash.split('$', 1)[0] != _method_prefix(hash_method())
+
+
+def _executor():
+    with _lock:
+        # Un pool par processus (les workers gunicorn sont forkés)
+        if _pool['pid'] != os.getpid():
+            workers = current_app.config.get('PASSWORD_WORKERS', 2)
+            queued = current_app.config.get('PASSWORD_QUEUE_LIMIT', 8)
+            _pool['executor'] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password')
+            _pool['slots'] = threading.BoundedSemaphore(workers + queued)
+            _pool['pid'] = os.getpid()
+        return _pool['executor'], _pool['slots']
+
+
+def verify_password(password_hash, password):
+    """Vérifie un mot de passe dans le pool ; lève PasswordBusy si le pool est saturé.
+
+    Sans hash (utilisateur inconnu), un hash factice est vérifié quand même
+    pour que la durée de réponse ne révèle pas les comptes existants.
+    """
+    executor, slots = _executor()
+    if not slots.acquire(blocking=False):
+        raise PasswordBusy()
+    try:
+        future = executor.submit(check_password_hash,
+                                 password_hash or _dummy_hash(hash_method()), password)
+    except RuntimeError:
+        slots.release()
+        raise PasswordBusy()
+    # La place n'est libérée qu'à la fin réelle du calcul, même après un abandon
+    future.add_done_callback(lambda f: slots.release())
+    try:
+        valid = future.result(timeout=current_app.config.get('PASSWORD_TIMEOUT', 10))
+    except TimeoutError:
+        future.cancel()
+        raise PasswordBusy()
+    return valid and password_hash is not None
@@ -0,0 +1,119 @@
+import datetime
+import random
+import re
+
+from sqlalchemy import event
+
+from app.models import db, Employee, EmployeeHistory, User, Department
+from app.pagination import encode_cursor
+
+# Petites tables bornées par construction : un parcours complet est normal
+SMALL_TABLES = {'stats_global', 'departments', 'stats_annee', 'data_versions', 'alembic_version'}
+
+# « SCAN employees » sans index = parcours complet de la table
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)$')
+
+
+def sample_urls():
+    """Pages à contrôler, avec des paramètres réalistes tirés de la base"""
+    employee = Employee.query.order_by(Employee.id).first()
+    if employee is None:
+        return []
+    cursor = encode_cursor([employee.nom, employee.id])
+    departement = employee.departement or 'IT'
+    prefix = employee.nom[:3]
+    return [
+        '/employes',
+        f'/employes?apres={cursor}',
+        f'/employes?avant={cursor}',
+        f'/employes?departement={departement}&compter=1',
+        f'/employes?salaire_min={employee.salaire}&compter=1',
+        f'/employes?recherche={prefix}&compter=1',
+        f'/employes?recherche={prefix}&departement={departement}',
+        f'/historique/{employee.id}',
+        '/stats',
+    ]
+
+
+def capture_queries(app, urls, user_id):
+    """Exécute les pages via le client de test et relève les SELECT émis"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            captured.append((captured_url, statement, parameters))
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    caching = app.config.get('CACHE_ENABLED', True)
+    app.config['CACHE_ENABLED'] = False
+    try:
+        for captured_url in urls:
+            response = client.get(captured_url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{captured_url} a répondu {response.status_code}")
+    finally:
+        app.config['CACHE_ENABLED'] = caching
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return captured
+
+
+def explain(statement, parameters):
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+
+def check_query_plans(app):
+    """Renvoie [(url, requête, plan, tables parcourues entièrement)] pour chaque SELECT émis"""
+    if db.engine.dialect.name != 'sqlite':
+        raise RuntimeError("Contrôle des plans disponible uniquement sous SQLite")
+
+    admin = User.query.filter_by(role='admin').first()
+    tables = set(db.inspect(db.engine).get_table_names())
+    results = []
+    seen = set()
+    for url, statement, parameters in capture_queries(app, sample_urls(), admin.id):
+        if statement in seen:
+            continue
+        seen.add(statement)
+        plan = explain(statement, parameters)
+        scans = []
+        for detail in plan:
+            match = FULL_SCAN_RE.match(detail)
+            if match and match.group(1) in tables and match.group(1) not in SMALL_TABLES:
+                scans.append(match.group(1))
+        results.append((url, statement, plan, scans))
+    return results
+
+
+def seed_employees(count, seed=42):
+    """Remplit une base vide avec des employés et un historique factices, puis ANALYZE"""
+    rng = random.Random(seed)
+    depts = db.session.scalars(db.select(Department.id)).all()
+    start = datetime.date(2000, 1, 1)
+    admin = User.query.filter_by(role='admin').first()
+
+    db.session.execute(db.insert(Employee), [{
+        'nom': f'Nom{rng.randrange(count)}',
+        'prenom': f'Prenom{i}',
+        'email': f'employe{i}@seed.local',
+        'departement_id': rng.choice(depts),
+        'poste': 'Poste',
+        'salaire': round(rng.uniform(1800, 9000), 2),
+        'date_embauche': start + datetime.timedelta(days=rng.randrange(9000)),
+    } for i in range(count)])
+    db.session.execute(db.insert(EmployeeHistory), [{
+        'employee_id': rng.randrange(1, count + 1),
+        'user_id': admin.id,
+        'action': 'update',
+        'changes': '{}',
+    } for _ in range(count)])
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
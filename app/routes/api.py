@@ -0,0 +1,177 @@
+import json
+from datetime import date, datetime
+from functools import wraps
+
+from flask import Blueprint, Response, request
+from flask_login import current_user
+
+from app.models import db, Employee, EmployeeHistory, User, Department
+from app.cache import get_data_version, EMPLOYEES, HISTORY, DEPARTMENTS
+from app.departments import department_id
+from app.pagination import keyset_paginate
+from app.search import search_filter
+from app.compression import matching_etag
+
+# API JSON en lecture pour les outils internes (session de connexion requise).
+#
+# Chaque réponse porte un ETag fort tiré des versions de données : un client
+# qui renvoie If-None-Match reçoit 304 sans qu'aucune requête ne soit lancée
+# (une seule lecture de data_versions). Listes paginées par clé, comme les pages
+# HTML ; sérialisation compacte (lignes en tableaux, sans espaces).
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+# À incrémenter si le format des réponses change (les ETag des clients tombent)
+API_FORMAT = 1
+PER_PAGE = 100
+MAX_PER_PAGE = 500
+
+EMPLOYEE_FIELDS = ['id', 'nom', 'prenom', 'email', 'telephone', 'departement', 'poste',
+                   'salaire', 'date_embauche', 'updated_at']
+# Département exposé par son code (jointure sur la petite table departments)
+EMPLOYEE_COLUMNS = [Department.code.label(name) if name == 'departement' else getattr(Employee, name)
+                    for name in EMPLOYEE_FIELDS]
+HISTORY_FIELDS = ['id', 'action', 'timestamp', 'utilisateur', 'changes']
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} non sérialisable")
+
+
+def json_response(data, status=200):
+    body = json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=_default)
+    return Response(body, status=status, mimetype='application/json')
+
+
+def api_error(message, status):
+    return json_response({'erreur': message}, status)
+
+
+@api_bp.before_request
+def require_login():
+    # Pas de redirection vers la page de connexion : un client JSON attend un 401
+    if not current_user.is_authenticated:
+        return api_error('Authentification requise', 401)
+
+
+def versioned(*names):
+    """ETag fort = versions des données ; 304 avant d'exécuter la vue si rien n'a changé"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            versions = '.'.join(str(get_data_version(name)) for name in names)
+            etag = f'{API_FORMAT}-{versions}'
+            # Le client peut renvoyer l'ETag de la version compressée (voir app/compression.py)
+            matched = matching_etag(etag)
+            if matched:
+                response = Response(status=304)
+                response.set_etag(matched)
+            else:
+                response = f(*args, **kwargs)
+                if response.status_code == 200:
+                    response.set_etag(etag)
+            if response.status_code in (200, 304):
+                # Réponse propre à l'utilisateur connecté, toujours revalidée
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+
+def _employee_columns():
+    return db.session.query(*EMPLOYEE_COLUMNS).outerjoin(Department, Employee.departement_id == Department.id)
+
+
+def _per_page():
+    limite = request.args.get('limite', PER_PAGE, type=int)
+    return max(1, min(limite, MAX_PER_PAGE))
+
+
+def _page(pagination, rows):
+    return {
+        'items': rows,
+        'suivant': pagination.next_cursor if pagination.has_next else None,
+        'precedent': pagination.prev_cursor if pagination.has_prev else None,
+    }
+
+
+@api_bp.route('/employes')
+@versioned(EMPLOYEES)
+def employes():
+    recherche = request.args.get('recherche', '')
+    departement = request.args.get('departement', '')
+    salaire_min = request.args.get('salaire_min', '')
+
+    # Colonnes seulement : pas d'objets Employee à hydrater
+    query = _employee_columns()
+    rank = None
+    if recherche:
+        query, rank = search_filter(query, recherche)
+    if departement:
+        dept_id = department_id(departement)
+        query = query.filter(Employee.departement_id == dept_id if dept_id is not None else db.false())
+    if salaire_min:
+        try:
+            query = query.filter(Employee.salaire >= float(salaire_min))
+        except ValueError:
+            return api_error('salaire_min invalide', 400)
+
+    after, before = request.args.get('apres', ''), request.args.get('avant', '')
+    if rank is not None:
+        pagination = keyset_paginate(query.add_columns(rank), [rank, Employee.id], _per_page(),
+                                     after=after, before=before, key=lambda row: [row[-1], row.id])
+        rows = [list(row[:-1]) for row in pagination.items]
+    else:
+        pagination = keyset_paginate(query, [Employee.nom, Employee.id], _per_page(),
+                                     after=after, before=before)
+        rows = [list(row) for row in pagination.items]
+    return json_response(dict(_page(pagination, rows), champs=EMPLOYEE_FIELDS))
+
+
+@api_bp.route('/employes/<int:id>')
+@versioned(EMPLOYEES)
+def employe(id):
+    row = _employee_columns().filter(Employee.id == id).first()
+    if row is None:
+        return api_error('Employé introuvable', 404)
+    return json_response(row._asdict())
+
+
+@api_bp.route('/employes/<int:id>/historique')
+@versioned(EMPLOYEES, HISTORY)
+def historique(id):
+    # Historique conservé après suppression : pas de contrôle d'existence de l'employé
+    query = db.session.query(
+        EmployeeHistory.id, EmployeeHistory.action, EmployeeHistory.timestamp,
+        User.username, EmployeeHistory.changes
+    ).outerjoin(User, EmployeeHistory.user_id == User.id).filter(EmployeeHistory.employee_id == id)
+    pagination = keyset_paginate(query, [EmployeeHistory.timestamp, EmployeeHistory.id], _per_page(),
+                                 after=request.args.get('apres', ''),
+                                 before=request.args.get('avant', ''),
+                                 descending=True)
+    rows = []
+    for row in pagination.items:
+        try:
+            changes = json.loads(row.changes) if row.changes else None
+        except ValueError:
+            changes = None
+        rows.append([row.id, row.action, row.timestamp, row.username, changes])
+    return json_response(dict(_page(pagination, rows), champs=HISTORY_FIELDS))
+
+
+@api_bp.route('/departements')
+@versioned(EMPLOYEES, DEPARTMENTS)
+def departements():
+    # Agrégats maintenus à chaque écriture (voir app/aggregates.py)
+    rows = db.session.query(
+        Department.code, Department.libelle, Department.effectif, Department.salaire_total
+    ).filter(Department.effectif > 0).order_by(Department.effectif.desc()).all()
+    return json_response([{
+        'departement': code,
+        'libelle': libelle,
+        'effectif': effectif,
+        'salaire_moyen': round(total / effectif, 2),
+        'masse_salariale': round(total, 2),
+    } for code, libelle, effectif, total in rows])
@@ -1,7 +1,11 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models import db, User
-from app.forms import LoginForm, UserForm
+from app.forms import LoginForm, UserForm, ROLES
+from app.user_cache import invalidate_user
+from app.database import retry_on_busy
+from app.passwords import verify_password, needs_rehash, PasswordBusy
+from app.throttle import retry_after, record_failure, reset_attempts
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__)
@@ -31,19 +35,40 @@ def login():
     
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(username=form.username.data).first()
+        username = form.username.data
+        ip = request.remote_addr
         
-        if user and user.check_password(form.password.data):
+        # Trop d'échecs récents : refus avant tout calcul de hash
+        wait = retry_after(username, ip)
+        if wait:
+            flash(f'❌ Trop de tentatives, réessayez dans {(wait + 59) // 60} min', 'error')
+            return render_template('login.html', form=form), 429
+        
+        user = User.query.filter_by(username=username).first()
+        try:
+            valid = verify_password(user.password_hash if user else None, form.password.data)
+        except PasswordBusy:
+            flash('⏳ Serveur occupé, réessayez dans un instant', 'error')
+            return render_template('login.html', form=form), 503
+        
+        if valid:
             if not user.is_active:
                 flash('❌ Ce compte est désactivé', 'error')
                 return render_template('login.html', form=form)
             
+            reset_attempts(username)
+            # Paramètres de hachage modifiés : nouveau hash avec le mot de passe en clair
+            if needs_rehash(user.password_hash):
+                user.set_password(form.password.data)
+                db.session.commit()
+            
             login_user(user, remember=True)
             flash(f'✅ Bienvenue {user.username} !', 'success')
             
             next_page = request.args.get('next')
             return redirect(next_page or url_for('employees.index'))
         else:
+            record_failure(username, ip)
             flash('❌ Identifiants incorrects', 'error')
     
     return render_template('login.html', form=form)
@@ -60,11 +85,37 @@ def logout():
 @admin_required
 def list_users():
     users = User.query.all()
-    return render_template('users.html', users=users)
+    return render_template('users.html', users=users, roles=ROLES)
+
+@auth_bp.route('/users/<int:id>/modifier', methods=['POST'])
+@login_required
+@admin_required
+@retry_on_busy
+def update_user(id):
+    user = User.query.get_or_404(id)
+    role = request.form.get('role', user.role)
+    is_active = request.form.get('is_active') == '1'
+    
+    if role not in dict(ROLES):
+        flash('❌ Rôle inconnu', 'error')
+        return redirect(url_for('auth.list_users'))
+    if user.id == current_user.id and (role != 'admin' or not is_active):
+        flash('❌ Vous ne pouvez pas retirer vos propres droits d\'administrateur', 'error')
+        return redirect(url_for('auth.list_users'))
+    
+    user.role = role
+    user.is_active = is_active
+    db.session.commit()
+    # Pris en compte dès la requête suivante, dans tous les workers
+    invalidate_user(user.id)
+    
+    flash(f'✅ Utilisateur {user.username} mis à jour', 'success')
+    return redirect(url_for('auth.list_users'))
 
 @auth_bp.route('/users/add', methods=['GET', 'POST'])
 @login_required
 @admin_required
+@retry_on_busy
 def add_user():
     form = UserForm()
     if form.validate_on_submit():
@@ -1,12 +1,24 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, Response
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, Response, stream_with_context,
+                   jsonify, abort, current_app)
 from flask_login import login_required, current_user
+from sqlalchemy.orm import contains_eager
 from app.models import db, Employee, EmployeeHistory
+from app.audit import record_action
 from app.forms import EmployeeForm
+from app.exports import iter_employee_rows
+from app.pagination import keyset_paginate
+from app.search import search_filter
+from app import aggregates
+from app.database import retry_on_busy
+from app.importer import import_employees, read_rows, ImportFileError
+from app.jobs import start_export, get_job, get_executor, job_progress, DONE, FAILED
+from app.artifacts import (FORMATS, available_formats, export_version, artifact_path, write_artifact,
+                           tee_artifact, finalize_artifact, send_artifact, DOWNLOAD_NAME)
+from app.cache import cached, bump_data_version
+from app.departments import departments, department_id, department_codes
 from functools import wraps
-from io import StringIO, BytesIO
-import csv
 import json
-import pandas as pd
+import os
 
 employees_bp = Blueprint('employees', __name__)
 
@@ -20,45 +32,61 @@ def edit_required(f):
     return decorated_function
 
 def log_action(employee_id, action, changes=None):
-    """Enregistre une action dans l'historique"""
-    history = EmployeeHistory(
-        employee_id=employee_id,
-        user_id=current_user.id,
-        action=action,
-        changes=json.dumps(changes) if changes else None
-    )
-    db.session.add(history)
+    """Enregistre une action dans l'historique (voir app/audit.py)"""
+    record_action(employee_id, current_user.id, action, changes)
+
+def decode_changes(changes):
+    """Décode le JSON des changements en [(champ, ancienne valeur, nouvelle valeur)]"""
+    try:
+        values = json.loads(changes) if changes else {}
+    except ValueError:
+        return []
+    if not isinstance(values, dict):
+        return []
+    # Une création ne stocke que les nouvelles valeurs
+    return [(field, value.get('old'), value.get('new')) if isinstance(value, dict)
+            else (field, None, value)
+            for field, value in values.items()]
 
 @employees_bp.route('/')
 @login_required
 def index():
-    total = Employee.query.count()
+    total, _, _ = aggregates.global_stats()
     return render_template('index.html', total=total)
 
+def liste_header():
+    """Données d'en-tête de la liste (mises en cache, voir app/cache.py)"""
+    total_employes, salaire_moyen, _ = aggregates.global_stats()
+    
+    return {
+        'total_employes': total_employes,
+        'salaire_moyen': salaire_moyen
+    }
+
 @employees_bp.route('/employes')
 @login_required
 def liste():
-    page = request.args.get('page', 1, type=int)
     per_page = 10
+    after = request.args.get('apres', '')
+    before = request.args.get('avant', '')
+    # Le total filtré coûte un COUNT(*) : uniquement sur demande
+    compter = request.args.get('compter', '') == '1'
     
     recherche = request.args.get('recherche', '')
     departement = request.args.get('departement', '')
     salaire_min = request.args.get('salaire_min', '', type=str)
     
     query = Employee.query
+    rank = None
     
     if recherche:
-        search_term = f'%{recherche}%'
-        query = query.filter(
-            db.or_(
-                Employee.nom.ilike(search_term),
-                Employee.prenom.ilike(search_term),
-                Employee.email.ilike(search_term)
-            )
-        )
+        # Index plein texte (FTS5) : insensible aux accents, par préfixe, trié par pertinence
+        query, rank = search_filter(query, recherche)
     
     if departement:
-        query = query.filter(Employee.departement == departement)
+        # Code du département -> clé entière (liste en cache, pas de requête)
+        dept_id = department_id(departement)
+        query = query.filter(Employee.departement_id == dept_id if dept_id is not None else db.false())
     
     if salaire_min:
         try:
@@ -66,21 +94,28 @@ def liste():
         except ValueError:
             pass
     
-    query = query.order_by(Employee.nom)
-    
-    # Pagination
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    employees = pagination.items
+    # En-tête (stats) : en cache tant qu'aucun employé n'est modifié
+    header = cached('liste_header', liste_header)
+    total_employes = header['total_employes']
+    salaire_moyen = header['salaire_moyen']
     
-    # Stats
-    total_employes = Employee.query.count()
-    salaire_moyen = db.session.query(db.func.avg(Employee.salaire)).scalar() or 0
-    
-    # Liste des départements pour le filtre
-    departements = db.session.query(Employee.departement).distinct().filter(
-        Employee.departement.isnot(None)
-    ).all()
-    departements = [d[0] for d in departements if d[0]]
+    # Pagination par clé (nom, id) : la page 5000 coûte autant que la première
+    filtre_actif = bool(recherche or departement or salaire_min)
+    if not filtre_actif:
+        total = total_employes
+    elif compter:
+        total = query.order_by(None).count()
+    else:
+        total = None
+    if rank is not None:
+        pagination = keyset_paginate(query.add_columns(rank), [rank, Employee.id], per_page,
+                                     after=after, before=before, total=total,
+                                     key=lambda row: [row[1], row[0].id])
+        employees = [row[0] for row in pagination.items]
+    else:
+        pagination = keyset_paginate(query, [Employee.nom, Employee.id], per_page,
+                                     after=after, before=before, total=total)
+        employees = pagination.items
     
     return render_template('employes.html',
                          employees=employees,
@@ -90,11 +125,14 @@ def liste():
                          recherche=recherche,
                          departement=departement,
                          salaire_min=salaire_min,
-                         departements=departements)
+                         per_page=per_page,
+                         departements=departments(),
+                         export_formats=[(name, FORMATS[name]['label']) for name in available_formats()])
 
 @employees_bp.route('/ajouter', methods=['GET', 'POST'])
 @login_required
 @edit_required
+@retry_on_busy
 def ajouter():
     form = EmployeeForm()
     
@@ -109,7 +147,7 @@ def ajouter():
             prenom=form.prenom.data,
             email=form.email.data,
             telephone=form.telephone.data,
-            departement=form.departement.data,
+            departement_id=form.departement_id.data,
             poste=form.poste.data,
             salaire=form.salaire.data,
             date_embauche=form.date_embauche.data
@@ -117,6 +155,8 @@ def ajouter():
         
         db.session.add(employee)
         db.session.flush()  # Pour obtenir l'ID
+        aggregates.record_insert(employee)
+        bump_data_version()
         
         log_action(employee.id, 'create', {
             'nom': employee.nom,
@@ -130,9 +170,35 @@ def ajouter():
     
     return render_template('ajouter.html', form=form)
 
+@employees_bp.route('/importer', methods=['GET', 'POST'])
+@login_required
+@edit_required
+def importer():
+    report = None
+    
+    if request.method == 'POST':
+        fichier = request.files.get('fichier')
+        if not fichier or not fichier.filename:
+            flash('❌ Aucun fichier sélectionné', 'error')
+            return redirect(url_for('employees.importer'))
+        
+        try:
+            report = import_employees(read_rows(fichier.stream, fichier.filename), current_user.id)
+        except ImportFileError as e:
+            flash(f'❌ {e}', 'error')
+            return redirect(url_for('employees.importer'))
+        
+        if report.inserted:
+            flash(f'✅ {report.inserted} employé(s) importé(s) sur {report.total}', 'success')
+        if report.errors:
+            flash(f'⚠️ {len(report.errors)} ligne(s) rejetée(s)', 'error')
+    
+    return render_template('importer.html', report=report)
+
 @employees_bp.route('/modifier/<int:id>', methods=['GET', 'POST'])
 @login_required
 @edit_required
+@retry_on_busy
 def modifier(id):
     employee = Employee.query.get_or_404(id)
     form = EmployeeForm(obj=employee)
@@ -150,14 +216,23 @@ def modifier(id):
         
         # Enregistrer les changements pour l'historique
         changes = {}
+        codes = department_codes()
         for field in ['nom', 'prenom', 'email', 'telephone', 'departement', 'poste', 'salaire']:
-            old_value = getattr(employee, field)
-            new_value = getattr(form, field).data
+            if field == 'departement':
+                # Codes plutôt qu'identifiants : historique lisible
+                old_value = employee.departement
+                new_value = codes.get(form.departement_id.data)
+            else:
+                old_value = getattr(employee, field)
+                new_value = getattr(form, field).data
             if old_value != new_value:
                 changes[field] = {'old': old_value, 'new': new_value}
         
         # Mettre à jour
+        avant = aggregates.snapshot(employee)
         form.populate_obj(employee)
+        aggregates.record_update(avant, employee)
+        bump_data_version()
         
         if changes:
             log_action(employee.id, 'update', changes)
@@ -171,6 +246,7 @@ def modifier(id):
 @employees_bp.route('/supprimer/<int:id>', methods=['POST'])
 @login_required
 @edit_required
+@retry_on_busy
 def supprimer(id):
     employee = Employee.query.get_or_404(id)
     nom_complet = f"{employee.prenom} {employee.nom}"
@@ -181,6 +257,8 @@ def supprimer(id):
         'email': employee.email
     })
     
+    aggregates.record_delete(employee)
+    bump_data_version()
     db.session.delete(employee)
     db.session.commit()
     
@@ -190,62 +268,108 @@ def supprimer(id):
 @employees_bp.route('/historique/<int:id>')
 @login_required
 def historique(id):
+    per_page = 50
     employee = Employee.query.get_or_404(id)
-    history = EmployeeHistory.query.filter_by(employee_id=id).order_by(
-        EmployeeHistory.timestamp.desc()
-    ).all()
-    return render_template('historique.html', employee=employee, history=history)
+    # Auteur chargé dans la même requête (jointure) au lieu d'un SELECT par ligne
+    query = EmployeeHistory.query.filter_by(employee_id=id).outerjoin(
+        EmployeeHistory.user
+    ).options(contains_eager(EmployeeHistory.user))
+    # Du plus récent au plus ancien, par clé (timestamp, id) : pas d'OFFSET
+    pagination = keyset_paginate(query, [EmployeeHistory.timestamp, EmployeeHistory.id], per_page,
+                                 after=request.args.get('apres', ''),
+                                 before=request.args.get('avant', ''),
+                                 descending=True)
+    history = [(h, decode_changes(h.changes)) for h in pagination.items]
+    return render_template('historique.html', employee=employee, history=history,
+                           pagination=pagination)
+
+def _finalize_later(path):
+    # Variantes compressées et éviction dans le pool des exports, hors requête
+    get_executor(current_app).submit(finalize_artifact, current_app._get_current_object(), path)
+
+def _export(export_format):
+    # Fichier en cache pour cette version des données : servi tel quel (sendfile)
+    spec = FORMATS[export_format]
+    epoch, version = export_version()
+    path = artifact_path(export_format, epoch, version)
+    if os.path.exists(path):
+        return send_artifact(export_format, epoch, version, path)
+    if 'stream' in spec:
+        # Format texte : export en flux (lecture par lots), recopié dans le cache au passage
+        chunks = spec['stream'](iter_employee_rows())
+        return Response(
+            stream_with_context(tee_artifact(export_format, epoch, version, chunks, on_complete=_finalize_later)),
+            mimetype=spec['mimetype'],
+            headers={'Content-Disposition': f"attachment;filename={DOWNLOAD_NAME}.{spec['extension']}"}
+        )
+    # Fichier binaire écrit lot par lot depuis le curseur, dans le cache
+    path = write_artifact(export_format, epoch, version, iter_employee_rows())
+    _finalize_later(path)
+    return send_artifact(export_format, epoch, version, path)
 
 @employees_bp.route('/export/csv')
 @login_required
 def export_csv():
-    employees = Employee.query.order_by(Employee.nom).all()
-    
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['ID', 'Nom', 'Prénom', 'Email', 'Téléphone', 'Poste', 'Salaire (€)', 'Date Embauche', 'Département'])
-    
-    for emp in employees:
-        writer.writerow([
-            emp.id, emp.nom, emp.prenom, emp.email,
-            emp.telephone or '', emp.poste, f"{emp.salaire:.2f}",
-            emp.date_embauche.strftime('%Y-%m-%d') if emp.date_embauche else '',
-            emp.departement or ''
-        ])
-    
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment;filename=huma_rh_export.csv'}
-    )
+    return _export('csv')
 
 @employees_bp.route('/export/excel')
 @login_required
 def export_excel():
-    employees = Employee.query.order_by(Employee.nom).all()
-    
-    data = [{
-        'ID': emp.id,
-        'Nom': emp.nom,
-        'Prénom': emp.prenom,
-        'Email': emp.email,
-        'Téléphone': emp.telephone or '',
-        'Poste': emp.poste,
-        'Salaire': emp.salaire,
-        'Date Embauche': emp.date_embauche,
-        'Département': emp.departement or ''
-    } for emp in employees]
-    
-    df = pd.DataFrame(data)
-    output = BytesIO()
-    
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Employés', index=False)
-    
-    output.seek(0)
-    
-    return Response(
-        output.read(),
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': 'attachment;filename=huma_rh_export.xlsx'}
-    )
\ No newline at end of file
+    return _export('excel')
+
+@employees_bp.route('/export/<format>')
+@login_required
+def export_format(format):
+    # NDJSON, Parquet, Arrow : colonnes typées pour les outils d'analyse
+    if format not in available_formats():
+        abort(404)
+    return _export(format)
+
+@employees_bp.route('/export/<format>/tache', methods=['POST'])
+@login_required
+def lancer_export(format):
+    # Export construit en arrière-plan : pas de requête bloquée jusqu'au timeout gunicorn
+    if format not in available_formats():
+        abort(404)
+    job, created = start_export(format)
+    if not created:
+        flash('ℹ️ Un export identique est déjà disponible ou en cours', 'success')
+    return redirect(url_for('employees.suivi_export', job_id=job['id']))
+
+def _job_or_404(job_id):
+    job = get_job(job_id)
+    if job is None:
+        abort(404)
+    return job
+
+@employees_bp.route('/export/tache/<job_id>')
+@login_required
+def suivi_export(job_id):
+    job = _job_or_404(job_id)
+    return render_template('export_job.html', job=job, progress=job_progress(job),
+                           label=FORMATS[job['format']]['label'])
+
+@employees_bp.route('/export/tache/<job_id>/statut')
+@login_required
+def statut_export(job_id):
+    job = _job_or_404(job_id)
+    return jsonify(
+        status=job['status'],
+        done=job['done'],
+        total=job['total'],
+        progress=job_progress(job),
+        error=job['error'] if job['status'] == FAILED else None,
+        download_url=url_for('employees.telecharger_export', job_id=job_id) if job['status'] == DONE else None,
+    )
+
+@employees_bp.route('/export/tache/<job_id>/fichier')
+@login_required
+def telecharger_export(job_id):
+    job = _job_or_404(job_id)
+    if job['status'] != DONE:
+        abort(404)
+    if not os.path.exists(job['path']):
+        # Retiré du cache depuis : l'export est à relancer
+        flash('❌ Fichier expiré, relancez l\'export', 'error')
+        return redirect(url_for('employees.liste'))
+    return send_artifact(job['format'], job['epoch'], job['version'], job['path'])
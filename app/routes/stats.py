@@ -1,40 +1,69 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, jsonify
 from flask_login import login_required
-from app.models import db, Employee
+from app.models import db, Employee, Department, StatsAnnee
+from app.routes.auth import admin_required
+from app import aggregates
+from app.cache import cached, cache_stats
+from app.distribution import salary_distribution
+from app.snapshot import get_snapshot, snapshot_stats
+from app.compression import compression_stats
 
 stats_bp = Blueprint('stats', __name__)
 
-@stats_bp.route('/stats')
-@login_required
-def dashboard():
-    total_employes = Employee.query.count()
-    salaire_moyen = db.session.query(db.func.avg(Employee.salaire)).scalar() or 0
-    salaire_total = db.session.query(db.func.sum(Employee.salaire)).scalar() or 0
+def dashboard_data():
+    """Données du tableau de bord (sérialisables, mises en cache)"""
+    # Agrégats maintenus à chaque écriture : coût indépendant de l'effectif
+    total_employes, salaire_moyen, salaire_total = aggregates.global_stats()
     
     # Stats par département
     depts = db.session.query(
-        Employee.departement,
-        db.func.count(Employee.id).label('count'),
-        db.func.avg(Employee.salaire).label('avg_salaire'),
-        db.func.sum(Employee.salaire).label('total_salaire')
-    ).filter(Employee.departement.isnot(None)).group_by(
-        Employee.departement
-    ).order_by(db.desc('count')).all()
+        Department.code.label('departement'),
+        Department.effectif.label('count'),
+        (Department.salaire_total / Department.effectif).label('avg_salaire'),
+        Department.salaire_total.label('total_salaire')
+    ).filter(Department.effectif > 0).order_by(db.desc('count')).all()
     
     # Top salaires
-    top_salaires = Employee.query.order_by(Employee.salaire.desc()).limit(5).all()
+    top_salaires = db.session.query(
+        Employee.nom, Employee.prenom, Employee.poste, Employee.salaire, Department.code.label('departement')
+    ).outerjoin(Department, Employee.departement_id == Department.id).order_by(
+        Employee.salaire.desc()).limit(5).all()
     
     # Évolution par année
     evolution = db.session.query(
-        db.func.strftime('%Y', Employee.date_embauche).label('annee'),
-        db.func.count(Employee.id).label('embauches'),
-        db.func.avg(Employee.salaire).label('salaire_moyen')
-    ).group_by('annee').order_by('annee').all()
+        db.func.nullif(StatsAnnee.annee, '').label('annee'),
+        StatsAnnee.embauches.label('embauches'),
+        (StatsAnnee.salaire_total / StatsAnnee.embauches).label('salaire_moyen')
+    ).filter(StatsAnnee.embauches > 0).order_by(StatsAnnee.annee).all()
     
-    return render_template('stats.html',
-                         total_employes=total_employes,
-                         salaire_moyen=salaire_moyen,
-                         salaire_total=salaire_total,
-                         depts=depts,
-                         top_salaires=top_salaires,
-                         evolution=evolution)
\ No newline at end of file
+    return {
+        'total_employes': total_employes,
+        'salaire_moyen': salaire_moyen,
+        'salaire_total': salaire_total,
+        'depts': [row._asdict() for row in depts],
+        'top_salaires': [row._asdict() for row in top_salaires],
+        'evolution': [row._asdict() for row in evolution]
+    }
+
+@stats_bp.route('/stats')
+@login_required
+def dashboard():
+    data = cached('stats_dashboard', dashboard_data)
+    # Percentiles, histogramme et tranches (NumPy, voir app/distribution.py)
+    distribution = cached('salary_distribution', salary_distribution)
+    return render_template('stats.html', distribution=distribution, **data)
+
+@stats_bp.route('/dashboard')
+@login_required
+def departements_chart():
+    # Effectifs par département, calculés sur l'instantané en mémoire
+    groups = [g for g in get_snapshot().by_departement() if g[0] is not None]
+    return render_template('dashboard.html',
+                           departments=[name for name, _, _ in groups],
+                           counts=[count for _, count, _ in groups])
+
+@stats_bp.route('/stats/cache')
+@login_required
+@admin_required
+def cache_counters():
+    return jsonify({**cache_stats(), 'snapshot': snapshot_stats(), 'compression': compression_stats()})
@@ -0,0 +1,119 @@
+import re
+
+from app.models import db, Employee
+
+# Index plein texte SQLite (FTS5) adossé à la table employees :
+# - unicode61 + remove_diacritics : « Hélène » et « helene » se valent
+# - prefix : index des préfixes de 2 et 3 caractères pour la saisie partielle
+FTS_TABLE = 'employees_fts'
+
+FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        nom, prenom, email,
+        content='employees', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employees_fts_ai AFTER INSERT ON employees BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, nom, prenom, email)
+        VALUES (new.id, new.nom, new.prenom, new.email);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employees_fts_ad AFTER DELETE ON employees BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, nom, prenom, email)
+        VALUES ('delete', old.id, old.nom, old.prenom, old.email);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employees_fts_au AFTER UPDATE OF nom, prenom, email ON employees BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, nom, prenom, email)
+        VALUES ('delete', old.id, old.nom, old.prenom, old.email);
+        INSERT INTO {FTS_TABLE}(rowid, nom, prenom, email)
+        VALUES (new.id, new.nom, new.prenom, new.email);
+    END
+    """,
+]
+
+_fts_available = {}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled():
+    """Vrai si la base est SQLite et que l'index FTS5 est en place"""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+    if engine.url not in _fts_available:
+        exists = db.session.execute(
+            db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        _fts_available[engine.url] = exists is not None
+    return _fts_available[engine.url]
+
+
+def init_search_index():
+    """Crée l'index et ses triggers s'ils n'existent pas (remplit l'index à la création)"""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.begin() as conn:
+        exists = conn.execute(
+            db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        try:
+            for ddl in FTS_DDL:
+                conn.execute(db.text(ddl))
+        except db.exc.OperationalError:
+            # SQLite compilé sans FTS5 : on garde la recherche LIKE
+            _fts_available[engine.url] = False
+            return False
+        if not exists:
+            conn.execute(db.text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    _fts_available[engine.url] = True
+    return True
+
+
+def rebuild_search_index():
+    """Reconstruit entièrement l'index (bases existantes, après import brut...)"""
+    if not init_search_index():
+        return None
+    db.session.execute(db.text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    db.session.commit()
+    return Employee.query.count()
+
+
+def build_match_query(recherche):
+    """Transforme la saisie en requête FTS5 : chaque mot devient un préfixe, tous requis"""
+    tokens = TOKEN_RE.findall(recherche)
+    return ' AND '.join(f'"{token}"*' for token in tokens)
+
+
+def search_filter(query, recherche):
+    """Filtre `query` sur la recherche ; renvoie (query, colonne de pertinence ou None)"""
+    match = build_match_query(recherche) if fts_enabled() else ''
+    if not match:
+        # Repli (autre moteur que SQLite, ou saisie sans mot) : LIKE sur les trois colonnes
+        search_term = f'%{recherche}%'
+        return query.filter(
+            db.or_(
+                Employee.nom.ilike(search_term),
+                Employee.prenom.ilike(search_term),
+                Employee.email.ilike(search_term)
+            )
+        ), None
+
+    fts = db.table(FTS_TABLE, db.column('rowid'))
+    matches = db.select(
+        fts.c.rowid.label('id'),
+        db.func.bm25(db.literal_column(FTS_TABLE)).label('rank')
+    ).where(db.literal_column(FTS_TABLE).op('MATCH')(match)).subquery('search')
+
+    query = query.join(matches, Employee.id == matches.c.id)
+    return query, matches.c.rank
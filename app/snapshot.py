@@ -0,0 +1,230 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+
+from app.models import db, Employee, Department
+from app.cache import get_data_version
+from app import aggregates
+
+# Instantané en colonnes de la table employees, gardé en mémoire par worker
+# pour les statistiques : tableaux NumPy (id, salaire, date d'embauche, codes
+# de département et de poste) et une seule copie de chaque libellé distinct.
+# 32 octets par employé (32 Mo pour 1M), quelle que soit la longueur
+# des textes.
+#
+# Construit au premier usage, puis rafraîchi quand la version des données
+# change : seules les lignes modifiées depuis le dernier updated_at vu sont
+# relues (index ix_employees_updated_at) ; une suppression se voit à l'effectif.
+# Chaque rafraîchissement crée un nouvel objet : un calcul en cours garde un
+# instantané cohérent.
+
+# Département lu par son code (jointure sur la petite table departments)
+SELECT_SQL = (f'SELECT e.id, d.code, e.poste, e.salaire, e.date_embauche FROM {Employee.__tablename__} e '
+              f'LEFT JOIN {Department.__tablename__} d ON d.id = e.departement_id')
+WATERMARK_SQL = f'SELECT max(updated_at) FROM {Employee.__tablename__}'
+IDS_SQL = f'SELECT id FROM {Employee.__tablename__}'
+CHUNK_SIZE = 50000
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+_lock = threading.Lock()
+_state = {'pid': None, 'snapshot': None}
+_counters = {'full': 0, 'incremental': 0}
+
+
+def _encode(values, index, labels):
+    """Codes entiers des libellés ; index (libellé -> code) et labels sont complétés"""
+    def code(value):
+        found = index.get(value)
+        if found is None:
+            found = index[value] = len(labels)
+            labels.append(value)
+        return found
+    return np.fromiter((code(v) for v in values), np.int32, len(values))
+
+
+def _read(sql, params, categories):
+    """Lit des lignes employés en colonnes (dict nom -> tableau)"""
+    chunks = []
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            ids, departements, postes, salaires, dates = zip(*rows)
+            chunks.append({
+                'id': np.array(ids, np.int64),
+                'departement': _encode(departements, *categories['departement']),
+                'poste': _encode(postes, *categories['poste']),
+                'salaire': np.array(salaires, np.float64),
+                'date_embauche': np.array(dates, 'datetime64[D]'),
+            })
+    finally:
+        cursor.close()
+    if not chunks:
+        return _empty_columns()
+    return {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]}
+
+
+def _read_watermark():
+    """Plus grand updated_at (index), lu avant les lignes et sans transaction commune
+    (pysqlite n'ouvre pas de BEGIN pour un SELECT) : une ligne validée entre les deux
+    lectures a un updated_at au moins égal au repère (à SNAPSHOT_OVERLAP près) et sera
+    relue au rafraîchissement suivant ; la relire deux fois est sans effet"""
+    return db.session.connection().exec_driver_sql(WATERMARK_SQL).scalar()
+
+
+def _empty_columns():
+    return {
+        'id': np.empty(0, np.int64),
+        'departement': np.empty(0, np.int32),
+        'poste': np.empty(0, np.int32),
+        'salaire': np.empty(0, np.float64),
+        'date_embauche': np.empty(0, 'datetime64[D]'),
+    }
+
+
+class EmployeeSnapshot:
+    """Colonnes triées par id ; ne jamais modifier les tableaux (partagés entre threads)"""
+
+    def __init__(self, columns, categories, version, watermark):
+        self.columns = columns
+        self.categories = categories
+        self.version = version
+        self.watermark = watermark
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['columns'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def departement_labels(self):
+        return self.categories['departement'][1]
+
+    @property
+    def poste_labels(self):
+        return self.categories['poste'][1]
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    def mask(self, departement=None, salaire_min=None, embauche_depuis=None):
+        """Filtre vectorisé (tableau de booléens) ; None = pas de condition"""
+        selected = np.ones(len(self), dtype=bool)
+        if departement is not None:
+            code = self.categories['departement'][0].get(departement)
+            if code is None:
+                return np.zeros(len(self), dtype=bool)
+            selected &= self.departement == code
+        if salaire_min is not None:
+            selected &= self.salaire >= salaire_min
+        if embauche_depuis is not None:
+            selected &= self.date_embauche >= np.datetime64(embauche_depuis, 'D')
+        return selected
+
+    def by_departement(self, mask=None):
+        """[(departement, effectif, masse salariale)] par effectif décroissant"""
+        codes, salaires = self.departement, self.salaire
+        if mask is not None:
+            codes, salaires = codes[mask], salaires[mask]
+        labels = self.departement_labels
+        counts = np.bincount(codes, minlength=len(labels))
+        totals = np.bincount(codes, weights=salaires, minlength=len(labels))
+        groups = [(label, int(c), float(t)) for label, c, t in zip(labels, counts, totals) if c]
+        return sorted(groups, key=lambda g: -g[1])
+
+    def merge(self, delta, categories, version, watermark, effectif):
+        """Nouvel instantané : lignes de delta ajoutées ou remplacées, supprimées retirées"""
+        keep = ~np.isin(self.id, delta['id'])
+        columns = {name: np.concatenate((column[keep], delta[name])) for name, column in self.columns.items()}
+        order = np.argsort(columns['id'], kind='stable')
+        columns = {name: column[order] for name, column in columns.items()}
+        if len(columns['id']) != effectif:
+            # Plus de lignes que d'employés : des suppressions à retirer
+            current = _read_ids()
+            present = np.isin(columns['id'], current, assume_unique=True)
+            columns = {name: column[present] for name, column in columns.items()}
+        return EmployeeSnapshot(columns, categories, version, watermark)
+
+
+def _read_ids():
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.execute(IDS_SQL)
+        return np.fromiter((row[0] for row in cursor), np.int64)
+    finally:
+        cursor.close()
+
+
+def _new_categories():
+    return {'departement': ({}, []), 'poste': ({}, [])}
+
+
+def build_snapshot(version):
+    categories = _new_categories()
+    watermark = _read_watermark()
+    columns = _read(SELECT_SQL, (), categories)
+    order = np.argsort(columns['id'], kind='stable')
+    columns = {name: column[order] for name, column in columns.items()}
+    _counters['full'] += 1
+    return EmployeeSnapshot(columns, categories, version, watermark)
+
+
+def refresh_snapshot(snapshot, version):
+    """Relit seulement les lignes modifiées depuis le dernier updated_at vu"""
+    if snapshot is None or snapshot.watermark is None:
+        return build_snapshot(version)
+
+    # Marge : une transaction lente peut valider un updated_at antérieur au repère
+    overlap = current_app.config.get('SNAPSHOT_OVERLAP', 60)
+    since = datetime.fromisoformat(snapshot.watermark) - timedelta(seconds=overlap)
+    # Copies : l'ancien instantané reste intact pour ses lecteurs
+    categories = {name: (dict(index), list(labels)) for name, (index, labels) in snapshot.categories.items()}
+    watermark = _read_watermark()
+    delta = _read(SELECT_SQL + ' WHERE e.updated_at >= ?', (since.strftime(TIMESTAMP_FORMAT),), categories)
+
+    if len(delta['id']) > current_app.config.get('SNAPSHOT_REBUILD_RATIO', 0.2) * max(len(snapshot), 1):
+        return build_snapshot(version)
+    effectif = aggregates.global_stats()[0]
+    _counters['incremental'] += 1
+    return snapshot.merge(delta, categories, version, watermark, effectif)
+
+
+def _current():
+    return _state['snapshot'] if _state['pid'] == os.getpid() else None
+
+
+def get_snapshot():
+    """Instantané à jour pour la version courante des données (par processus)"""
+    version = get_data_version()
+    snapshot = _current()
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        snapshot = _current()
+        if snapshot is None or snapshot.version != version:
+            snapshot = refresh_snapshot(snapshot, version)
+            _state.update(pid=os.getpid(), snapshot=snapshot)
+    return snapshot
+
+
+def snapshot_stats():
+    """Taille et rafraîchissements de l'instantané du processus courant"""
+    snapshot = _current()
+    return {
+        'rows': len(snapshot) if snapshot is not None else 0,
+        'nbytes': snapshot.nbytes if snapshot is not None else 0,
+        'version': snapshot.version if snapshot is not None else None,
+        'full_builds': _counters['full'],
+        'incremental_refreshes': _counters['incremental'],
+    }
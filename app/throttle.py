@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+# Limitation des tentatives de connexion, avant tout hachage de mot de passe.
+# Les échecs sont notés dans un petit fichier SQLite local partagé par les
+# workers gunicorn (par défaut instance/login_attempts.db) : au plus
+# LOGIN_MAX_ATTEMPTS_USER échecs par identifiant et LOGIN_MAX_ATTEMPTS_IP par
+# adresse IP sur LOGIN_THROTTLE_WINDOW secondes. Derrière un reverse proxy,
+# l'adresse vient de X-Forwarded-For (PROXY_FIX_HOPS, voir app/__init__.py).
+
+_local = threading.local()
+
+
+def _path():
+    return current_app.config.get('LOGIN_THROTTLE_DB_PATH') or \
+        os.path.join(current_app.instance_path, 'login_attempts.db')
+
+
+def _connection():
+    path = _path()
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'path', None) != path:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = sqlite3.connect(path, timeout=1, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS attempts (
+                key TEXT NOT NULL,
+                at REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_attempts_key_at ON attempts (key, at)')
+        _local.conn = conn
+        _local.path = path
+    return conn
+
+
+def _keys(username, ip):
+    keys = [('user:' + (username or '').strip().lower(), current_app.config.get('LOGIN_MAX_ATTEMPTS_USER', 5))]
+    ip_limit = current_app.config.get('LOGIN_MAX_ATTEMPTS_IP', 20)
+    if ip_limit:
+        keys.append(('ip:' + (ip or ''), ip_limit))
+    return keys
+
+
+def retry_after(username, ip):
+    """Secondes à attendre si l'identifiant ou l'IP a trop d'échecs récents, sinon 0"""
+    window = current_app.config.get('LOGIN_THROTTLE_WINDOW', 300)
+    now = time.time()
+    wait = 0
+    try:
+        conn = _connection()
+        for key, limit in _keys(username, ip):
+            rows = conn.execute(
+                'SELECT at FROM attempts WHERE key = ? AND at > ? ORDER BY at DESC LIMIT ?',
+                (key, now - window, limit)
+            ).fetchall()
+            if len(rows) >= limit:
+                # Débloqué quand le plus ancien des `limit` derniers échecs sort de la fenêtre
+                wait = max(wait, rows[-1][0] + window - now)
+    except sqlite3.Error:
+        return 0  # limiteur en « best effort » : ne bloque pas la connexion
+    return int(wait) + 1 if wait else 0
+
+
+def record_failure(username, ip):
+    window = current_app.config.get('LOGIN_THROTTLE_WINDOW', 300)
+    now = time.time()
+    try:
+        conn = _connection()
+        # Purge des échecs expirés (table de petite taille par construction)
+        conn.execute('DELETE FROM attempts WHERE at <= ?', (now - window,))
+        conn.executemany('INSERT INTO attempts (key, at) VALUES (?, ?)',
+                         [(key, now) for key, _ in _keys(username, ip)])
+    except sqlite3.Error:
+        pass
+
+
+def reset_attempts(username):
+    """Après une connexion réussie, les échecs de l'identifiant sont oubliés"""
+    try:
+        _connection().execute('DELETE FROM attempts WHERE key = ?',
+                              ('user:' + (username or '').strip().lower(),))
+    except sqlite3.Error:
+        pass
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+from flask import current_app
+from flask_login import UserMixin
+
+from app.models import db, User
+
+# Cache des utilisateurs connectés, par worker, pour le user_loader de
+# Flask-Login : un instantané léger (id, username, role, is_active) gardé
+# USER_CACHE_TTL secondes au lieu d'un SELECT sur users à chaque requête.
+#
+# Invalidation immédiate entre workers : toute modification d'un utilisateur
+# réécrit un petit fichier témoin ; chaque worker compare sa date de
+# modification (un simple stat) et vide son cache si elle a changé.
+
+_lock = threading.Lock()
+_users = {}  # id -> (expiration, instantané)
+_stamp = {'value': None}
+
+
+class UserSnapshot(UserMixin):
+    """Utilisateur connecté, détaché de la session SQLAlchemy"""
+
+    def __init__(self, id, username, role, is_active):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.active = bool(is_active)
+
+    @property
+    def is_active(self):
+        return self.active
+
+    def is_admin(self):
+        return self.role == 'admin'
+
+    def can_edit(self):
+        return self.role in ['admin', 'rh']
+
+
+def _stamp_path():
+    return current_app.config.get('USER_CACHE_STAMP') or \
+        os.path.join(current_app.instance_path, 'users.stamp')
+
+
+def _read_stamp():
+    try:
+        return os.stat(_stamp_path()).st_mtime_ns
+    except OSError:
+        return None
+
+
+def invalidate_user(user_id=None):
+    """À appeler après toute modification d'un utilisateur (rôle, statut...)"""
+    with _lock:
+        if user_id is None:
+            _users.clear()
+        else:
+            _users.pop(user_id, None)
+    # Prévient les autres workers
+    path = _stamp_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(str(time.time_ns()))
+
+
+def load_snapshot(user_id):
+    ttl = current_app.config.get('USER_CACHE_TTL', 30)
+    now = time.monotonic()
+
+    stamp = _read_stamp()
+    with _lock:
+        if stamp != _stamp['value']:
+            _users.clear()
+            _stamp['value'] = stamp
+        entry = _users.get(user_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    row = db.session.execute(
+        db.select(User.id, User.username, User.role, User.is_active).where(User.id == user_id)
+    ).first()
+    snapshot = UserSnapshot(*row) if row else None
+    if ttl > 0:
+        with _lock:
+            _users[user_id] = (now + ttl, snapshot)
+    return snapshot
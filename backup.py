@@ -1,13 +1,23 @@
-import shutil
+"""Sauvegarde de la base : préférer 'flask backup' (voir app/backup.py).
+
+Conservé pour les tâches planifiées existantes : python backup.py
+"""
 import os
-from datetime import datetime
+
+from app import create_app
+from app.backup import create_backup, rotate_backups
+
 
 def backup_database():
-    db_path = "instance/huma_rh.db"  # Ajustez le chemin
-    backup_dir = "backups"
-    os.makedirs(backup_dir, exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = f"{backup_dir}/huma_rh_{timestamp}.db"
-    shutil.copy2(db_path, backup_path)
-    print(f"✅ Backup créé : {backup_path}")
\ No newline at end of file
+    app = create_app()
+    backup_dir = app.config.get('BACKUP_DIR') or os.path.join(app.instance_path, 'backups')
+    with app.app_context():
+        backup_path = create_backup(backup_dir, pages=app.config['BACKUP_STEP_PAGES'],
+                                    sleep=app.config['BACKUP_STEP_SLEEP'])
+        rotate_backups(backup_dir, hourly=app.config['BACKUP_KEEP_HOURLY'],
+                       daily=app.config['BACKUP_KEEP_DAILY'], weekly=app.config['BACKUP_KEEP_WEEKLY'])
+    print(f"✅ Backup créé : {backup_path}")
+
+
+if __name__ == '__main__':
+    backup_database()
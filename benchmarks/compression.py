@@ -0,0 +1,92 @@
+"""Taux et coût CPU de la compression des réponses, par encodage et niveau.
+
+Les corps sont produits une fois par l'application (sans Accept-Encoding),
+puis compressés bloc par bloc comme le fait app/compression.py. Le temps de
+transfert est estimé pour un lien lent (--link-kbps).
+
+Usage : python -m benchmarks.compression --employees 20000 --link-kbps 2000
+"""
+import argparse
+import json
+import tempfile
+import time
+import zlib
+
+from benchmarks.run import create_bench_app
+
+URLS = ['/employes', '/stats', '/api/employes?limite=500', '/export/csv']
+CHUNK = 64 * 1024
+
+
+def compressors():
+    yield 'gzip-1', lambda: zlib.compressobj(1, zlib.DEFLATED, 31)
+    yield 'gzip-6', lambda: zlib.compressobj(6, zlib.DEFLATED, 31)
+    yield 'gzip-9', lambda: zlib.compressobj(9, zlib.DEFLATED, 31)
+    try:
+        import brotli
+    except ImportError:
+        return
+    for quality in (1, 4, 6, 11):
+        yield f'br-{quality}', lambda quality=quality: _Brotli(brotli.Compressor(quality=quality))
+
+
+class _Brotli:
+    def __init__(self, obj):
+        self.compress, self.flush = obj.process, obj.finish
+
+
+def measure(body, factory):
+    compressor = factory()
+    started = time.process_time()
+    size = 0
+    for i in range(0, len(body), CHUNK):
+        size += len(compressor.compress(body[i:i + CHUNK]))
+    size += len(compressor.flush())
+    return size, time.process_time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=20000)
+    parser.add_argument('--link-kbps', type=float, default=2000, help='Débit du lien simulé (kbit/s)')
+    parser.add_argument('--output', help='Enregistre les résultats en JSON')
+    args = parser.parse_args()
+
+    from benchmarks.generator import populate
+    from app.models import User
+
+    app = create_bench_app(tempfile.mkdtemp(prefix='huma_compress_'))
+    populate(app, args.employees)
+    with app.app_context():
+        admin_id = User.query.filter_by(username='admin').first().id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin_id)
+        session['_fresh'] = True
+
+    print(f"📊 {args.employees} employés, lien {args.link_kbps:.0f} kbit/s")
+    results = {}
+    for url in URLS:
+        body = client.get(url).get_data()
+        raw_transfer = len(body) * 8 / args.link_kbps
+        print(f"  {url} : {len(body) / 1024:.0f} Ko, transfert {raw_transfer:.0f} ms sans compression")
+        results[url] = {'bytes': len(body), 'variants': {}}
+        for name, factory in compressors():
+            size, cpu = measure(body, factory)
+            transfer = size * 8 / args.link_kbps
+            results[url]['variants'][name] = {
+                'bytes': size,
+                'ratio': round(size / len(body), 3) if body else None,
+                'cpu_ms': round(cpu * 1000, 2),
+                'transfer_ms': round(transfer, 1),
+            }
+            print(f"    {name:<7} {size / 1024:8.0f} Ko | ratio {size / max(len(body), 1):.3f} | "
+                  f"CPU {cpu * 1000:7.1f} ms | total {cpu * 1000 + transfer:8.0f} ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Résultats enregistrés dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
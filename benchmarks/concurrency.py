@@ -0,0 +1,172 @@
+"""Débit en lectures/écritures mélangées, plusieurs processus × threads sur la même base SQLite.
+
+Compare le profil SQLite par défaut (SQLITE_PROFILE=0) au profil concurrent
+(WAL, synchronous=NORMAL, busy_timeout, pool ; voir app/database.py).
+
+Usage : python -m benchmarks.concurrency --employees 20000 --processes 4 --threads 2 --duration 15
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.run import ROOT, create_bench_app, percentile
+
+MODES = [('défaut', '0'), ('profil', '1')]
+
+
+def setup(workdir, employees):
+    from benchmarks.generator import populate
+
+    app = create_bench_app(workdir)
+    populate(app, employees)
+
+
+def load_targets(app, count=2000):
+    from app.models import db, Employee
+
+    with app.app_context():
+        rows = db.session.execute(
+            db.select(Employee.id, Employee.nom, Employee.prenom, Employee.email,
+                      Employee.poste, Employee.salaire, Employee.date_embauche, Employee.departement_id)
+            .order_by(db.func.random()).limit(count)
+        ).all()
+    return [row._asdict() for row in rows]
+
+
+def worker(workdir, start_at, duration, threads, write_ratio, seed):
+    app = create_bench_app(workdir)
+    targets = load_targets(app)
+    from app.models import User
+    with app.app_context():
+        admin_id = User.query.filter_by(username='admin').first().id
+
+    results = []
+    lock = threading.Lock()
+
+    def run(thread_seed):
+        rng = random.Random(thread_seed)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin_id)
+            session['_fresh'] = True
+        samples = []
+        while time.time() < start_at:
+            time.sleep(0.01)
+        deadline = start_at + duration
+        while time.time() < deadline:
+            target = rng.choice(targets)
+            if rng.random() < write_ratio:
+                kind = 'write'
+                started = time.perf_counter()
+                response = client.post(f"/modifier/{target['id']}", data={
+                    'nom': target['nom'], 'prenom': target['prenom'], 'email': target['email'],
+                    'telephone': '', 'departement_id': target['departement_id'] or '', 'poste': target['poste'],
+                    'salaire': round(target['salaire'] * rng.uniform(0.95, 1.05), 2),
+                    'date_embauche': target['date_embauche'].isoformat(),
+                })
+            else:
+                kind = 'read'
+                url = rng.choice([
+                    '/employes',
+                    f"/employes?recherche={target['nom'][:3]}",
+                    f"/historique/{target['id']}",
+                    '/stats',
+                ])
+                started = time.perf_counter()
+                response = client.get(url)
+            response.get_data()
+            elapsed = (time.perf_counter() - started) * 1000
+            samples.append((kind, response.status_code < 500, elapsed))
+        with lock:
+            results.extend(samples)
+
+    pool = [threading.Thread(target=run, args=(seed * 100 + i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    print('@@RESULT@@' + json.dumps(results))
+
+
+def summarize(samples, duration):
+    summary = {}
+    for kind in ('read', 'write'):
+        ok = [s[2] for s in samples if s[0] == kind and s[1]]
+        errors = sum(1 for s in samples if s[0] == kind and not s[1])
+        summary[kind] = {
+            'ok': len(ok),
+            'errors': errors,
+            'per_s': round(len(ok) / duration, 1),
+            'p50_ms': round(percentile(ok, 50), 2) if ok else None,
+            'p95_ms': round(percentile(ok, 95), 2) if ok else None,
+        }
+    return summary
+
+
+def run_mode(profile, args):
+    workdir = tempfile.mkdtemp(prefix='huma_conc_')
+    env = dict(os.environ, SQLITE_PROFILE=profile)
+    subprocess.run([sys.executable, '-m', 'benchmarks.concurrency', '--setup', workdir,
+                    '--employees', str(args.employees)], cwd=ROOT, env=env, check=True,
+                   capture_output=True)
+
+    # Démarrage commun une fois tous les processus prêts (création de l'app comprise)
+    start_at = time.time() + 5
+    procs = [subprocess.Popen([sys.executable, '-m', 'benchmarks.concurrency', '--worker', workdir,
+                               '--start-at', str(start_at), '--duration', str(args.duration),
+                               '--threads', str(args.threads), '--write-ratio', str(args.write_ratio),
+                               '--seed', str(i)],
+                              cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+             for i in range(args.processes)]
+    samples = []
+    for proc in procs:
+        out, _ = proc.communicate()
+        for line in out.splitlines():
+            if line.startswith('@@RESULT@@'):
+                samples.extend(json.loads(line[len('@@RESULT@@'):]))
+    return summarize(samples, args.duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=20000)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--output', help='Enregistre les résultats en JSON')
+    parser.add_argument('--setup', help=argparse.SUPPRESS)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--start-at', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--seed', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.setup:
+        setup(args.setup, args.employees)
+        return
+    if args.worker:
+        worker(args.worker, args.start_at, args.duration, args.threads, args.write_ratio, args.seed)
+        return
+
+    print(f"📊 {args.employees} employés, {args.processes} processus × {args.threads} threads, "
+          f"{int(args.write_ratio * 100)} % d'écritures, {args.duration:.0f} s")
+    results = {}
+    for name, profile in MODES:
+        results[name] = summary = run_mode(profile, args)
+        for kind, r in summary.items():
+            print(f"  {name:<7} {kind:<5} {r['per_s']:8.1f} req/s | p50 {r['p50_ms']} ms | "
+                  f"p95 {r['p95_ms']} ms | {r['errors']} erreur(s)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Résultats enregistrés dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
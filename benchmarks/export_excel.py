@@ -0,0 +1,101 @@
+"""Benchmark de l'export Excel : ancienne version pandas vs moteur write-only.
+
+Usage : python -m benchmarks.export_excel --rows 10000 100000 500000
+(pandas n'est requis que par ce benchmark : pip install -r benchmarks/requirements.txt)
+"""
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+from benchmarks.run import ROOT, create_bench_app
+
+
+def export_pandas(Employee):
+    """Reproduction de l'ancienne implémentation (ORM + DataFrame + BytesIO)"""
+    import pandas as pd
+
+    employees = Employee.query.order_by(Employee.nom).all()
+    data = [{
+        'ID': emp.id,
+        'Nom': emp.nom,
+        'Prénom': emp.prenom,
+        'Email': emp.email,
+        'Téléphone': emp.telephone or '',
+        'Poste': emp.poste,
+        'Salaire': emp.salaire,
+        'Date Embauche': emp.date_embauche,
+        'Département': emp.departement or ''
+    } for emp in employees]
+    df = pd.DataFrame(data)
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Employés', index=False)
+    output.seek(0)
+    return len(output.read())
+
+
+def export_streaming():
+    """Nouvelle implémentation (curseur + classeur write-only + fichier temporaire)"""
+    from app.exports import iter_employee_rows, spool_xlsx, stream_file
+
+    return sum(len(chunk) for chunk in stream_file(spool_xlsx(iter_employee_rows())))
+
+
+def peak_rss_mb():
+    # ru_maxrss est en Ko sous Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def setup(workdir, rows):
+    from benchmarks.generator import populate
+
+    populate(create_bench_app(workdir), rows)
+
+
+def measure(workdir, engine):
+    # Base déjà peuplée par un autre processus : ru_maxrss étant un maximum,
+    # la génération des données fausserait sinon la référence
+    app = create_bench_app(workdir)
+    from app.models import Employee
+
+    with app.app_context():
+        baseline = peak_rss_mb()
+        started = time.perf_counter()
+        size = export_pandas(Employee) if engine == 'pandas' else export_streaming()
+        elapsed = time.perf_counter() - started
+    return elapsed, peak_rss_mb() - baseline, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--setup', help=argparse.SUPPRESS)
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    parser.add_argument('--engine', choices=['pandas', 'streaming'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.setup:
+        setup(args.setup, args.rows[0])
+        return
+    if args.measure:
+        elapsed, peak, size = measure(args.measure, args.engine)
+        print(f"{args.rows[0]:>8} lignes | {args.engine:<9} | {elapsed:7.2f} s | "
+              f"pic mémoire +{peak:7.1f} Mo | {size / 1024:9.0f} Ko", flush=True)
+        return
+
+    # Un processus pour peupler la base, puis un processus neuf par mesure
+    for rows in args.rows:
+        workdir = tempfile.mkdtemp(prefix='huma_bench_')
+        subprocess.run([sys.executable, '-m', 'benchmarks.export_excel', '--setup', workdir,
+                        '--rows', str(rows)], cwd=ROOT, check=True, capture_output=True)
+        for engine in ('pandas', 'streaming'):
+            subprocess.run([sys.executable, '-m', 'benchmarks.export_excel', '--measure', workdir,
+                            '--rows', str(rows), '--engine', engine], cwd=ROOT, check=True)
+
+
+if __name__ == '__main__':
+    main()
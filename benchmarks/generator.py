@@ -0,0 +1,168 @@
+"""Générateur déterministe d'une grande entreprise fictive.
+
+Usage : python -m benchmarks.generator chemin/vers/base.db --employees 100000
+"""
+import argparse
+import datetime
+import json
+import math
+import random
+import sqlite3
+import time
+import unicodedata
+
+# (département, part des effectifs, salaire médian, postes)
+DEPARTEMENTS = [
+    ('IT', 0.28, 4200, ['Développeur', 'Développeur senior', 'Architecte', 'Data Analyst', 'DevOps', 'Chef de projet']),
+    ('Commercial', 0.22, 3300, ['Commercial', 'Account Manager', 'Directeur commercial', 'Business Developer']),
+    ('Finance', 0.12, 3700, ['Comptable', 'Contrôleur de gestion', 'Trésorier', 'Auditeur']),
+    ('Marketing', 0.12, 3400, ['Chargé de marketing', 'Community Manager', 'Chef de produit']),
+    ('RH', 0.08, 3300, ['Chargé RH', 'RH Manager', 'Gestionnaire paie', 'Recruteur']),
+    ('Direction', 0.03, 8500, ['Directeur', 'Directeur adjoint', 'Assistant de direction']),
+    ('Logistique', 0.15, 2600, ['Magasinier', 'Responsable logistique', 'Préparateur']),
+]
+
+NOMS = [
+    'Martin', 'Bernard', 'Thomas', 'Petit', 'Robert', 'Richard', 'Durand', 'Dubois', 'Moreau', 'Laurent',
+    'Simon', 'Michel', 'Lefèvre', 'Leroy', 'Roux', 'David', 'Bertrand', 'Morel', 'Fournier', 'Girard',
+    'Bonnet', 'Dupont', 'Lambert', 'Fontaine', 'Rousseau', 'Vincent', 'Muller', 'Lefebvre', 'Faure', 'André',
+    'Mercier', 'Blanc', 'Guérin', 'Boyer', 'Garnier', 'Chevalier', 'François', 'Legrand', 'Gauthier', 'Garcia',
+    'Perrin', 'Robin', 'Clément', 'Morin', 'Nicolas', 'Henry', 'Roussel', 'Mathieu', 'Gautier', 'Masson',
+    'Nguyen', 'Diallo', 'Benali', 'Da Silva', 'Lopez', 'Kowalski', 'Haddad', 'Traoré', 'Ferreira', 'Cohen',
+]
+
+PRENOMS = [
+    'Jean', 'Marie', 'Pierre', 'Sophie', 'Luc', 'Hélène', 'Paul', 'Camille', 'Louis', 'Chloé',
+    'Hugo', 'Léa', 'Lucas', 'Manon', 'Nathan', 'Inès', 'Théo', 'Émilie', 'Arthur', 'Zoé',
+    'Jules', 'Anaïs', 'Gabriel', 'Céline', 'Raphaël', 'Julie', 'Mathis', 'Élodie', 'Noah', 'Sarah',
+    'Karim', 'Fatou', 'Mehdi', 'Yasmine', 'Antoine', 'Aurélie', 'Maxime', 'Laure', 'Thibault', 'Agathe',
+]
+
+# Fenêtre d'embauche : 25 ans, avec une croissance des recrutements
+HIRE_START = datetime.date(2001, 1, 1)
+HIRE_DAYS = 25 * 365
+
+DEPARTMENT_SQL = '''
+    INSERT OR IGNORE INTO departments (code, libelle, effectif, salaire_total) VALUES (?, ?, 0, 0)
+'''
+# Nouvelles données : les caches de l'application (liste des départements,
+# vues et exports dérivés des employés) sont invalidés
+VERSION_SQL = '''
+    INSERT INTO data_versions (name, version) VALUES (?, 1)
+    ON CONFLICT (name) DO UPDATE SET version = version + 1
+'''
+EMPLOYEE_SQL = '''
+    INSERT INTO employees (id, nom, prenom, email, telephone, departement_id, poste, salaire,
+                           date_embauche, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+HISTORY_SQL = '''
+    INSERT INTO employee_history (employee_id, user_id, action, changes, timestamp)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+
+def _ascii(value):
+    value = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in value if c.isalnum() and not unicodedata.combining(c)).lower()
+
+
+def _timestamp(moment):
+    """Horodatage au format écrit par SQLAlchemy ('%Y-%m-%d %H:%M:%S.%f') : SQLite
+    compare ces colonnes en texte, un format plus court trierait à part"""
+    return moment.isoformat(' ', timespec='microseconds')
+
+
+def iter_employees(count, seed=42):
+    """Employés déterministes : départements pondérés, salaires log-normaux, ancienneté croissante"""
+    rng = random.Random(seed)
+    weights = [d[1] for d in DEPARTEMENTS]
+    for i in range(1, count + 1):
+        departement, _, median, postes = rng.choices(DEPARTEMENTS, weights)[0]
+        # Davantage d'embauches récentes (croissance de l'entreprise)
+        day = int(HIRE_DAYS * math.sqrt(rng.random()))
+        date_embauche = HIRE_START + datetime.timedelta(days=day)
+        anciennete = (HIRE_DAYS - day) / 365
+        salaire = round(median * rng.lognormvariate(0, 0.25) * (1 + 0.015 * anciennete), 2)
+        nom = rng.choice(NOMS)
+        prenom = rng.choice(PRENOMS)
+        telephone = f"0{rng.randint(1, 9)}{rng.randrange(10 ** 8):08d}" if rng.random() < 0.8 else None
+        created = datetime.datetime.combine(date_embauche, datetime.time(9, 0))
+        yield (i, nom, prenom, f"{_ascii(prenom)}.{_ascii(nom)}.{i}@entreprise.fr", telephone,
+               departement, rng.choice(postes), salaire, date_embauche.isoformat(),
+               _timestamp(created), _timestamp(created))
+
+
+def iter_history(employees, user_id, seed=43, updates_mean=2.0):
+    """Une création par employé puis quelques modifications (loi géométrique)"""
+    rng = random.Random(seed)
+    p = 1 / (1 + updates_mean)
+    for emp_id, nom, prenom, email, _, _, _, salaire, date_embauche, _, _ in employees:
+        moment = datetime.datetime.fromisoformat(date_embauche) + datetime.timedelta(hours=9)
+        yield (emp_id, user_id, 'create',
+               json.dumps({'nom': nom, 'prenom': prenom, 'email': email}), _timestamp(moment))
+        while rng.random() > p:
+            moment += datetime.timedelta(days=rng.randint(30, 400))
+            nouveau = round(salaire * rng.uniform(1.01, 1.08), 2)
+            yield (emp_id, user_id, 'update',
+                   json.dumps({'salaire': {'old': salaire, 'new': nouveau}}), _timestamp(moment))
+            salaire = nouveau
+
+
+def generate(db_path, count, seed=42, user_id=1, batch_size=50000):
+    """Insère `count` employés et leur historique directement dans le fichier SQLite (base vide)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.executemany(DEPARTMENT_SQL, [(d[0], d[0]) for d in DEPARTEMENTS])
+        department_ids = dict(conn.execute('SELECT code, id FROM departments'))
+        employees = iter_employees(count, seed)
+        inserted = history = 0
+        while True:
+            batch = [row for _, row in zip(range(batch_size), employees)]
+            if not batch:
+                break
+            # Département par son code -> clé étrangère
+            conn.executemany(EMPLOYEE_SQL, [row[:5] + (department_ids[row[5]],) + row[6:] for row in batch])
+            rows = list(iter_history(batch, user_id, seed=seed + inserted))
+            conn.executemany(HISTORY_SQL, rows)
+            inserted += len(batch)
+            history += len(rows)
+        conn.executemany(VERSION_SQL, [('departments',), ('employees',)])
+        conn.commit()
+        conn.execute('ANALYZE')
+        conn.commit()
+    finally:
+        conn.close()
+    return inserted, history
+
+
+def populate(app, count, seed=42):
+    """Génère les données puis reconstruit les agrégats (l'index plein texte suit via ses triggers)"""
+    from app.models import db, User
+    from app.aggregates import rebuild_aggregates
+
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        db_path = db.engine.url.database
+        db.session.remove()
+        inserted, history = generate(db_path, count, seed=seed, user_id=admin.id)
+        rebuild_aggregates()
+    return inserted, history
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('database', help='Fichier SQLite (créé par l\'application)')
+    parser.add_argument('--employees', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    inserted, history = generate(args.database, args.employees, seed=args.seed)
+    print(f"✅ {inserted} employés, {history} lignes d'historique en {time.perf_counter() - started:.1f} s")
+    print("👉 Lancer ensuite 'flask stats-rebuild'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""Benchmark des pages de l'application sur une entreprise fictive.
+
+Usage : python -m benchmarks.run --sizes 10000 100000 1000000 --output resultats.json
+        python -m benchmarks.run --compare avant.json apres.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BLUEPRINTS = ('employees', 'stats', 'auth')
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values, p):
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (k - low)
+
+
+def create_bench_app(workdir):
+    # Tous les fichiers locaux dans le répertoire du benchmark (rien dans instance/)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['CACHE_DB_PATH'] = os.path.join(workdir, 'cache.db')
+    os.environ['EXPORT_CACHE_DIR'] = os.path.join(workdir, 'export_cache')
+    os.environ['EXPORT_JOBS_DB_PATH'] = os.path.join(workdir, 'export_jobs.db')
+    os.environ['LOGIN_THROTTLE_DB_PATH'] = os.path.join(workdir, 'login_attempts.db')
+    os.environ['USER_CACHE_STAMP'] = os.path.join(workdir, 'users.stamp')
+    os.environ['AUDIT_SPOOL_DIR'] = os.path.join(workdir, 'audit')
+    sys.path.insert(0, ROOT)
+
+    from app import create_app
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    # Une route en erreur est notée (statut 500) sans interrompre le benchmark
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    return app
+
+
+def finished_export_job(app, export_format='csv', timeout=600):
+    """Tâche d'export terminée (pages de suivi et de téléchargement)"""
+    from app.jobs import start_export, get_job, DONE, FAILED
+
+    with app.test_request_context():
+        job, _ = start_export(export_format)
+    deadline = time.monotonic() + timeout
+    while job['status'] not in (DONE, FAILED) and time.monotonic() < deadline:
+        time.sleep(0.1)
+        job = get_job(job['id'], app)
+    return job
+
+
+def route_urls(app):
+    """Une URL GET par route des blueprints employees, stats et auth, avec des
+    arguments valides : dernier employé, export CSV, tâche d'export terminée"""
+    from flask import url_for
+    from app.models import Employee
+
+    with app.app_context():
+        employee = Employee.query.order_by(Employee.id.desc()).first()
+    values = {'id': employee.id, 'format': 'csv', 'job_id': finished_export_job(app)['id']}
+    urls = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if rule.endpoint.split('.')[0] not in BLUEPRINTS or 'GET' not in rule.methods:
+            continue
+        with app.test_request_context():
+            urls.append((rule.endpoint, url_for(rule.endpoint, **{arg: values[arg] for arg in rule.arguments})))
+    return urls
+
+
+def bench_route(app, client, url, iterations, user_id):
+    from sqlalchemy import event
+    from app.models import db
+
+    queries = []
+
+    def count_query(*args):
+        queries[-1] += 1
+
+    def request():
+        # Réouvre la session à chaque fois (la route logout la ferme)
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        queries.append(0)
+        response = client.get(url)
+        response.get_data()
+        response.close()
+        return response.status_code
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count_query)
+    try:
+        status = request()  # chauffe (caches, plans préparés)
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            request()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        # Pic mémoire mesuré à part : tracemalloc ralentit les requêtes
+        tracemalloc.start()
+        request()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_query)
+
+    return {
+        'status': status,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': queries[-1],
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run_size(size, iterations):
+    from benchmarks.generator import populate
+
+    workdir = tempfile.mkdtemp(prefix='huma_bench_')
+    app = create_bench_app(workdir)
+
+    started = time.perf_counter()
+    employees, history = populate(app, size)
+    generation = time.perf_counter() - started
+
+    from app.models import User
+    with app.app_context():
+        admin_id = User.query.filter_by(username='admin').first().id
+
+    client = app.test_client()
+    routes = {}
+    for endpoint, url in route_urls(app):
+        routes[endpoint] = dict(url=url, **bench_route(app, client, url, iterations, admin_id))
+        r = routes[endpoint]
+        warning = '' if r['status'] < 400 else f"  ⚠️ statut {r['status']}"
+        print(f"  {endpoint:<28} p50 {r['p50_ms']:9.2f} ms | p95 {r['p95_ms']:9.2f} ms | "
+              f"{r['queries']:3} requêtes | pic {r['peak_memory_kb']:9.0f} Ko{warning}")
+    return {
+        'employees': employees,
+        'history_rows': history,
+        'generation_s': round(generation, 2),
+        'iterations': iterations,
+        'routes': routes,
+    }
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before.get('revision')} -> {after.get('revision')}")
+    for size, result in after['sizes'].items():
+        if size not in before['sizes']:
+            continue
+        print(f"\n{size} employés")
+        old_routes = before['sizes'][size]['routes']
+        for endpoint, new in result['routes'].items():
+            old = old_routes.get(endpoint)
+            if not old:
+                continue
+            ratio = new['p50_ms'] / old['p50_ms'] if old['p50_ms'] else float('inf')
+            print(f"  {endpoint:<28} p50 {old['p50_ms']:9.2f} -> {new['p50_ms']:9.2f} ms (x{ratio:5.2f}) | "
+                  f"requêtes {old['queries']} -> {new['queries']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('AVANT', 'APRES'))
+    parser.add_argument('--single', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if args.single:
+        # Processus enfant : une taille, résultat JSON sur la sortie standard
+        result = run_size(args.single, args.iterations)
+        print('@@RESULT@@' + json.dumps(result))
+        return
+
+    results = {
+        'revision': git_revision(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': {},
+    }
+    for size in args.sizes:
+        print(f"📊 {size} employés")
+        # Un processus par taille : mémoire et caches indépendants
+        proc = subprocess.run([sys.executable, '-m', 'benchmarks.run', '--single', str(size),
+                               '--iterations', str(args.iterations)],
+                              cwd=ROOT, capture_output=True, text=True, check=True)
+        for line in proc.stdout.splitlines():
+            if line.startswith('@@RESULT@@'):
+                results['sizes'][str(size)] = json.loads(line[len('@@RESULT@@'):])
+            elif line.startswith('  '):
+                print(line)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Résultats enregistrés dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
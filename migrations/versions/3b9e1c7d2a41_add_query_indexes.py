@@ -0,0 +1,46 @@
+"""Index des requêtes chaudes (liste, historique, stats)
+
+Revision ID: 3b9e1c7d2a41
+Revises: 
+Create Date: 2026-10-18 11:02:14.512301
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e1c7d2a41'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# Les tables sont créées par db.create_all() : les index peuvent déjà exister
+# sur une base neuve, d'où if_not_exists.
+INDEXES = [
+    ('ix_employees_nom_id', 'employees', ['nom', 'id']),
+    ('ix_employees_departement_nom_id', 'employees', ['departement', 'nom', 'id']),
+    ('ix_employees_salaire', 'employees', ['salaire']),
+    ('ix_employees_date_embauche_salaire', 'employees', ['date_embauche', 'salaire']),
+    ('ix_employee_history_employee_timestamp', 'employee_history', ['employee_id', 'timestamp', 'id']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        # Base créée par un modèle plus récent : colonne remplacée depuis
+        # (departement -> departement_id, voir c5e2a9d4b7f1)
+        if not set(columns) <= {column['name'] for column in inspector.get_columns(table)}:
+            continue
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+    # Statistiques pour le planificateur SQLite
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('ANALYZE')
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
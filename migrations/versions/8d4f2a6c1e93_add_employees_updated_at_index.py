@@ -0,0 +1,23 @@
+"""Index sur employees.updated_at (rafraîchissement de l'instantané des stats)
+
+Revision ID: 8d4f2a6c1e93
+Revises: 3b9e1c7d2a41
+Create Date: 2026-10-18 16:40:05.118402
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4f2a6c1e93'
+down_revision = '3b9e1c7d2a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_employees_updated_at', 'employees', ['updated_at'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_employees_updated_at', table_name='employees', if_exists=True)
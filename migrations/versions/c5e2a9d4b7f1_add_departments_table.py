@@ -0,0 +1,122 @@
+"""Table departments : employees.departement devient une clé étrangère
+
+Revision ID: c5e2a9d4b7f1
+Revises: 8d4f2a6c1e93
+Create Date: 2026-10-18 21:12:47.603918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2a9d4b7f1'
+down_revision = '8d4f2a6c1e93'
+branch_labels = None
+depends_on = None
+
+
+# Ex-choix du formulaire (libellés affichés) ; les autres valeurs trouvées en
+# base sont reprises avec leur code comme libellé.
+DEFAULT_DEPARTMENTS = [
+    ('IT', 'IT'),
+    ('RH', 'Ressources Humaines'),
+    ('Finance', 'Finance'),
+    ('Marketing', 'Marketing'),
+    ('Commercial', 'Commercial'),
+    ('Direction', 'Direction'),
+]
+
+# Invalide les caches dérivés des employés et la liste des départements
+BUMP_VERSION_SQL = '''
+    INSERT INTO data_versions (name, version) VALUES ('{name}', 1)
+    ON CONFLICT (name) DO UPDATE SET version = version + 1
+'''
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    # Base neuve : déjà créée par db.create_all() avec le nouveau modèle
+    if 'departments' not in tables:
+        op.create_table(
+            'departments',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('code', sa.String(length=100), nullable=False, unique=True),
+            sa.Column('libelle', sa.String(length=100), nullable=False),
+            sa.Column('effectif', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('salaire_total', sa.Float(), nullable=False, server_default='0'),
+        )
+
+    columns = {column['name'] for column in inspector.get_columns('employees')}
+    if 'departement' in columns:
+        existing = {row[0] for row in bind.execute(sa.text('SELECT code FROM departments'))}
+        labels = dict(DEFAULT_DEPARTMENTS)
+        found = [row[0] for row in bind.execute(sa.text(
+            "SELECT DISTINCT departement FROM employees WHERE departement IS NOT NULL AND departement != ''"
+        ))]
+        codes = [code for code, _ in DEFAULT_DEPARTMENTS] + sorted(set(found) - set(labels))
+        departments = sa.table('departments', sa.column('code'), sa.column('libelle'),
+                               sa.column('effectif'), sa.column('salaire_total'))
+        op.bulk_insert(departments, [
+            {'code': code, 'libelle': labels.get(code, code), 'effectif': 0, 'salaire_total': 0}
+            for code in codes if code not in existing
+        ])
+
+        if 'departement_id' not in columns:
+            op.add_column('employees', sa.Column('departement_id', sa.Integer(), nullable=True))
+        op.execute('UPDATE employees SET departement_id = '
+                   '(SELECT id FROM departments WHERE code = employees.departement)')
+
+        # Recopie de la table employees (SQLite) : les triggers de l'index plein
+        # texte disparaissent avec l'ancienne table et sont recréés au démarrage
+        # (init_search_index)
+        op.drop_index('ix_employees_departement_nom_id', table_name='employees', if_exists=True)
+        with op.batch_alter_table('employees') as batch_op:
+            batch_op.drop_column('departement')
+            batch_op.create_foreign_key('fk_employees_departement_id', 'departments',
+                                        ['departement_id'], ['id'])
+        op.create_index('ix_employees_departement_id_nom_id', 'employees',
+                        ['departement_id', 'nom', 'id'], unique=False, if_not_exists=True)
+
+    # Effectifs et masses salariales (remplacent stats_departement)
+    op.execute('''
+        UPDATE departments SET
+            effectif = (SELECT count(*) FROM employees WHERE departement_id = departments.id),
+            salaire_total = (SELECT coalesce(sum(salaire), 0) FROM employees
+                             WHERE departement_id = departments.id)
+    ''')
+    if 'stats_departement' in tables:
+        op.drop_table('stats_departement')
+
+    if 'data_versions' in tables:
+        for name in ('employees', 'departments'):
+            op.execute(BUMP_VERSION_SQL.format(name=name))
+    if bind.dialect.name == 'sqlite':
+        op.execute('ANALYZE')
+
+
+def downgrade():
+    op.create_table(
+        'stats_departement',
+        sa.Column('departement', sa.String(length=100), primary_key=True),
+        sa.Column('effectif', sa.Integer(), nullable=False),
+        sa.Column('salaire_total', sa.Float(), nullable=False),
+    )
+    op.execute('INSERT INTO stats_departement (departement, effectif, salaire_total) '
+               'SELECT code, effectif, salaire_total FROM departments WHERE effectif > 0')
+
+    op.add_column('employees', sa.Column('departement', sa.String(length=100), nullable=True))
+    op.execute('UPDATE employees SET departement = '
+               '(SELECT code FROM departments WHERE id = employees.departement_id)')
+    op.drop_index('ix_employees_departement_id_nom_id', table_name='employees', if_exists=True)
+    with op.batch_alter_table('employees') as batch_op:
+        batch_op.drop_constraint('fk_employees_departement_id', type_='foreignkey')
+        batch_op.drop_column('departement_id')
+    op.create_index('ix_employees_departement_nom_id', 'employees',
+                    ['departement', 'nom', 'id'], unique=False, if_not_exists=True)
+    op.drop_table('departments')
+
+    op.execute(BUMP_VERSION_SQL.format(name='employees'))